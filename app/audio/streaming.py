@@ -0,0 +1,108 @@
+import threading
+from math import gcd
+
+import numpy as np
+from scipy.signal import firwin
+
+KAISER_BETA = 5.0           # same anti-aliasing filter as scipy.signal.resample_poly
+HALF_LEN_FACTOR = 10        # filter half-length per max(up, down)
+
+
+class StreamingResampler:
+    """
+    Polyphase resampler for audio that arrives in blocks.
+
+    Equivalent to scipy.signal.resample_poly over the whole stream (same
+    Kaiser-windowed FIR from scipy.signal.firwin), but carries the input
+    history and the output phase across calls, so every callback block is
+    converted on its own without edge effects. Each output sample only
+    evaluates its own polyphase branch: O(filter length / up) multiplies.
+    """
+
+    def __init__(self, in_rate, out_rate):
+        g = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        self.passthrough = self.up == self.down
+        if self.passthrough:
+            return
+
+        half_len = HALF_LEN_FACTOR * max(self.up, self.down)
+        h = firwin(2 * half_len + 1, 1.0 / max(self.up, self.down), window=("kaiser", KAISER_BETA)) * self.up
+
+        # Branch p holds h[p], h[p + up], h[p + 2 up], ... (zero-padded)
+        self.taps = -(-len(h) // self.up)
+        padded = np.zeros(self.taps * self.up)
+        padded[:len(h)] = h
+        self.branches = padded.reshape(self.taps, self.up).T.astype(np.float32)
+
+        # Output k takes the newest input floor(k * down / up) and branch k * down % up;
+        # delay the output by the filter's group delay so it lines up with the input
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.consumed = 0                       # input samples seen so far
+        self.next_out = -(-half_len // self.down)  # next output sample index
+        self._t = np.arange(self.taps)
+
+    def process(self, x):
+        """Converts one block; returns the output samples it completes (float32)."""
+        if self.passthrough:
+            return np.asarray(x, dtype=np.float32)
+
+        x = np.concatenate((self.history, np.asarray(x, dtype=np.float32)))
+        first = self.consumed - len(self.history)   # stream index of x[0]
+        self.consumed += len(x) - len(self.history)
+
+        # Outputs whose newest input sample has arrived
+        last_out = ((self.consumed - 1) * self.up) // self.down
+        k = np.arange(self.next_out, last_out + 1)
+        self.next_out = max(self.next_out, last_out + 1)
+
+        y = np.empty(len(k), dtype=np.float32)
+        if len(k):
+            newest = (k * self.down) // self.up
+            phase = (k * self.down) % self.up
+            windows = x[(newest - first)[:, None] - self._t]
+            np.einsum("kt,kt->k", windows, self.branches[phase], out=y)
+
+        self.history = x[-(self.taps - 1):] if self.taps > 1 else x[:0]
+        return y
+
+
+class AudioRing:
+    """
+    Fixed-size ring of the newest samples.
+
+    The audio callback writes blocks in place (no per-block np.roll copy
+    of the whole window); the inference loop copies the window out in
+    chronological order with read_into().
+    """
+
+    def __init__(self, size):
+        self.data = np.zeros(size, dtype=np.float32)
+        self.pos = 0                # next write position = oldest sample
+        self.lock = threading.Lock()
+
+    def write(self, x):
+        n = len(x)
+        size = len(self.data)
+        with self.lock:
+            if n >= size:
+                self.data[:] = x[-size:]
+                self.pos = 0
+                return
+            end = self.pos + n
+            if end <= size:
+                self.data[self.pos:end] = x
+            else:
+                split = size - self.pos
+                self.data[self.pos:] = x[:split]
+                self.data[:n - split] = x[split:]
+            self.pos = end % size
+
+    def read_into(self, out):
+        """Copies the window (oldest first) into out, an array of the ring's size."""
+        with self.lock:
+            tail = len(self.data) - self.pos
+            out[:tail] = self.data[self.pos:]
+            out[tail:] = self.data[:self.pos]
+        return out
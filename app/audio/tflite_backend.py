@@ -0,0 +1,170 @@
+"""
+TFLite interpreter backends for the audio model.
+
+YAMNet only needs a TFLite interpreter, which the standalone runtimes
+(ai_edge_litert, tflite_runtime) provide without importing the full
+tensorflow package. Backends are imported lazily in order of preference;
+the thread count and the XNNPACK delegate are set explicitly and every
+interpreter is warmed up before the session starts.
+
+Run from the app/ directory to compare the installed backends:
+    python -m audio.tflite_backend
+    python -m audio.tflite_backend --threads 2 --runs 50
+"""
+import argparse
+import importlib
+import threading
+import time
+
+import numpy as np
+
+from utils.metrics import peak_rss_mb
+
+# Preference order; "tensorflow" is the fallback from requirements.txt
+BACKENDS = ("ai_edge_litert", "tflite_runtime", "tensorflow")
+
+DEFAULT_NUM_THREADS = 1     # the vision path needs the other cores
+WARMUP_RUNS = 3             # first invocations allocate and pack weights
+BENCHMARK_RUNS = 20
+
+_MODULES = {
+    "ai_edge_litert": "ai_edge_litert.interpreter",
+    "tflite_runtime": "tflite_runtime.interpreter",
+    "tensorflow": "tensorflow",
+}
+
+_import_times = {}          # backend -> seconds spent importing it
+_fastest = None
+_fastest_lock = threading.Lock()
+
+
+def _interpreter_module(backend):
+    """Module exposing Interpreter / OpResolverType for a backend (ImportError if missing)."""
+    t0 = time.perf_counter()
+    module = importlib.import_module(_MODULES[backend])
+    _import_times.setdefault(backend, time.perf_counter() - t0)
+    if backend == "tensorflow":
+        return module.lite, module.lite.experimental
+    return module, module
+
+
+def available_backends():
+    found = []
+    for backend in BACKENDS:
+        try:
+            _interpreter_module(backend)
+        except ImportError:
+            continue
+        found.append(backend)
+    return found
+
+
+def load_interpreter(model_content, backend=None, num_threads=DEFAULT_NUM_THREADS,
+                     xnnpack=True, warmup=WARMUP_RUNS):
+    """
+    Allocated, warmed-up interpreter for model_content.
+
+    backend: one of BACKENDS, None (first installed in preference order)
+    or "fastest" (benchmark the installed ones once per process).
+    xnnpack=False disables the default XNNPACK delegate.
+
+    Returns (interpreter, backend name).
+    """
+    if backend == "fastest":
+        backend = fastest_backend(model_content, num_threads=num_threads, xnnpack=xnnpack)
+    candidates = [backend] if backend else BACKENDS
+
+    for name in candidates:
+        try:
+            lite, experimental = _interpreter_module(name)
+        except ImportError:
+            if backend:
+                raise
+            continue
+
+        resolver = experimental.OpResolverType.AUTO if xnnpack else \
+            experimental.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        interpreter = lite.Interpreter(
+            model_content=model_content,
+            num_threads=num_threads,
+            experimental_op_resolver_type=resolver
+        )
+        interpreter.allocate_tensors()
+        for _ in range(warmup):
+            _invoke_zeros(interpreter)
+        return interpreter, name
+
+    raise ImportError(f"No TFLite backend installed (tried {', '.join(BACKENDS)})")
+
+
+def _invoke_zeros(interpreter):
+    details = interpreter.get_input_details()[0]
+    interpreter.set_tensor(details["index"], np.zeros(details["shape"], dtype=details["dtype"]))
+    interpreter.invoke()
+
+
+def benchmark(model_content, backends=None, runs=BENCHMARK_RUNS,
+              num_threads=DEFAULT_NUM_THREADS, xnnpack=True):
+    """backend -> {"import_s", "load_s", "median_ms", "p90_ms"} for each installed backend."""
+    results = {}
+    for name in backends or available_backends():
+        t0 = time.perf_counter()
+        interpreter, _ = load_interpreter(model_content, name, num_threads, xnnpack)
+        load_s = time.perf_counter() - t0
+
+        latencies = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            _invoke_zeros(interpreter)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        results[name] = {
+            "import_s": _import_times.get(name, 0.0),
+            "load_s": load_s,
+            "median_ms": float(np.median(latencies)),
+            "p90_ms": float(np.percentile(latencies, 90)),
+        }
+    return results
+
+
+def fastest_backend(model_content, num_threads=DEFAULT_NUM_THREADS, xnnpack=True):
+    """Backend with the lowest median latency; benchmarked once per process."""
+    global _fastest
+    with _fastest_lock:
+        if _fastest is None:
+            results = benchmark(model_content, num_threads=num_threads, xnnpack=xnnpack)
+            if not results:
+                raise ImportError(f"No TFLite backend installed (tried {', '.join(BACKENDS)})")
+            _fastest = min(results, key=lambda name: results[name]["median_ms"])
+            print("Audio backends: " + ", ".join(
+                f"{name} {r['median_ms']:.1f} ms" for name, r in results.items()
+            ) + f" -> {_fastest}")
+        return _fastest
+
+
+def main(argv=None):
+    from utils.assets import load_asset
+
+    parser = argparse.ArgumentParser(description="Benchmark the installed TFLite backends on YAMNet")
+    parser.add_argument("--model", default="models/yamnet.tflite")
+    parser.add_argument("--threads", type=int, default=DEFAULT_NUM_THREADS)
+    parser.add_argument("--runs", type=int, default=BENCHMARK_RUNS)
+    parser.add_argument("--no-xnnpack", action="store_true")
+    args = parser.parse_args(argv)
+
+    model = load_asset(args.model)
+    print(f"{'backend':<16}{'import s':>10}{'load s':>10}{'median ms':>11}{'p90 ms':>9}")
+    # Peak RSS is cumulative: the lightweight runtimes are measured first
+    for name in BACKENDS:
+        try:
+            r = benchmark(model, [name], args.runs, args.threads, not args.no_xnnpack)[name]
+        except ImportError:
+            print(f"{name:<16}{'not installed':>20}")
+            continue
+        rss_mb = peak_rss_mb()
+        rss = f"   peak RSS {rss_mb:.0f} MB" if rss_mb is not None else ""
+        print(f"{name:<16}{r['import_s']:>10.2f}{r['load_s']:>10.2f}"
+              f"{r['median_ms']:>11.2f}{r['p90_ms']:>9.2f}{rss}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+
+# ================= CONFIG =================
+
+OPEN_DB = 9.0              # open when a block is this far above the noise floor
+CLOSE_DB = 5.0             # ...and stays open until energy drops below floor + CLOSE_DB
+MIN_LEVEL_DB = -60.0       # never open below this level (dBFS)
+HANGOVER_SECONDS = 1.0     # stay open after the last loud block (>= one YAMNet window)
+FLOOR_FALL_SECONDS = 0.5   # noise floor follows quieter input quickly...
+FLOOR_RISE_SECONDS = 10.0  # ...and louder input slowly, so speech does not become "noise"
+PRE_EMPHASIS = 0.97        # first-order high-pass: ignores DC and low rumble (fans, HVAC)
+
+# =========================================
+
+
+class EnergyGate:
+    """
+    Streaming voice activity gate for the audio callback.
+
+    Each block's energy (RMS after pre-emphasis, in dBFS) is compared
+    with a tracked noise floor. The gate opens OPEN_DB above the floor
+    and closes only below floor + CLOSE_DB after HANGOVER_SECONDS, so
+    inference is skipped only when there is nothing that could be
+    laughter in the model's window. Costs O(block) per callback.
+    """
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.floor_db = None
+        self.level_db = -120.0
+        self.is_open = False
+        self._hold = 0.0            # seconds of hangover left
+        self._last = 0.0            # last sample of the previous block (pre-emphasis state)
+
+    def update(self, x):
+        """x: 1-D float32 block. Returns whether the gate is open."""
+        if len(x) == 0:
+            return self.is_open
+        dt = len(x) / self.sample_rate
+
+        emphasized = np.empty_like(x)
+        emphasized[0] = x[0] - PRE_EMPHASIS * self._last
+        emphasized[1:] = x[1:] - PRE_EMPHASIS * x[:-1]
+        self._last = x[-1]
+        rms = math.sqrt(float(np.dot(emphasized, emphasized)) / len(x))
+        level = 20.0 * math.log10(rms + 1e-10)
+        self.level_db = level
+
+        if self.floor_db is None:
+            self.floor_db = level
+        tau = FLOOR_FALL_SECONDS if level < self.floor_db else FLOOR_RISE_SECONDS
+        self.floor_db += (level - self.floor_db) * (1.0 - math.exp(-dt / tau))
+
+        threshold = self.floor_db + (CLOSE_DB if self.is_open else OPEN_DB)
+        if level > threshold and level > MIN_LEVEL_DB:
+            self.is_open = True
+            self._hold = HANGOVER_SECONDS
+        elif self.is_open:
+            self._hold -= dt
+            if self._hold <= 0.0:
+                self.is_open = False
+        return self.is_open
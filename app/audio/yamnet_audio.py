@@ -2,57 +2,136 @@
 import time
 import threading
 import numpy as np
-import sounddevice as sd
-import tensorflow as tf
+
+try:
+    import sounddevice as sd
+except OSError:
+    # PortAudio missing (headless server); a stream_factory must be supplied
+    sd = None
+
+from audio.streaming import AudioRing, StreamingResampler
+from audio.tflite_backend import DEFAULT_NUM_THREADS, load_interpreter
+from audio.vad import EnergyGate
+from utils.assets import load_asset
+from utils.metrics import METRICS
 
 YAMNET_PATH = "models/yamnet.tflite"
 
-# Shared state (read-only from main thread)
+# Shared state (read-only from main thread); latest score of any instance.
+# With several stations per process use YamnetAudio.laughter_score instead.
 audio_laughter_score = 0.0
 
 
 class YamnetAudio:
-    def __init__(self, sample_rate=16000):
+    def __init__(self, sample_rate=16000, stream_factory=None, device=None, block_sink=None, gate=True,
+                 backend=None, num_threads=DEFAULT_NUM_THREADS, xnnpack=True, capture_rate=None):
+        # sample_rate is the model's rate; the microphone runs at capture_rate
+        # (default: the device's native rate) and is resampled in the callback
         self.sample_rate = sample_rate
-
-        # Load YAMNet
-        self.interpreter = tf.lite.Interpreter(model_path=YAMNET_PATH)
-        self.interpreter.allocate_tensors()
+        self.device = device
+        # Called with (indata, monotonic capture time of its first sample) for every
+        # captured block, from the audio callback: it must copy and return at once
+        # (e.g. SessionRecorder.add_audio)
+        self.block_sink = block_sink
+        self.laughter_score = 0.0
+
+        # sd.InputStream-compatible factory (fake microphones plug in here)
+        self.stream_factory = stream_factory or sd.InputStream
+        self.capture_rate = int(capture_rate or self._native_rate(stream_factory, device) or sample_rate)
+        self.resampler = StreamingResampler(self.capture_rate, sample_rate)
+
+        # Load YAMNet (allocated and warmed up; see audio.tflite_backend)
+        # Model bytes are shared by every instance in the process
+        self.interpreter, self.backend = load_interpreter(
+            load_asset(YAMNET_PATH),
+            backend=backend,
+            num_threads=num_threads,
+            xnnpack=xnnpack
+        )
 
         self.input_details = self.interpreter.get_input_details()[0]
         self.output_details = self.interpreter.get_output_details()[0]
 
         self.expected_len = int(self.input_details["shape"][0])
+        # The callback writes 16 kHz samples into the ring; each inference
+        # copies the window into audio_buffer (the model input)
+        self.ring = AudioRing(self.expected_len)
         self.audio_buffer = np.zeros(self.expected_len, dtype=np.float32)
 
+        # monotonic time of the newest sample in the ring
+        self.last_block_time = None
+
+        # Skip inference (score 0) while the room is quiet
+        self.gate = EnergyGate(sample_rate) if gate else None
+        self.executed_invocations = 0
+        self.skipped_invocations = 0
+
         self.thread = threading.Thread(
             target=self._audio_loop,
+            name="yamnet-audio",
             daemon=True
         )
 
+    @staticmethod
+    def _native_rate(stream_factory, device):
+        if stream_factory is not None:
+            # Fake microphones advertise their rate
+            return getattr(stream_factory, "sample_rate", None)
+        try:
+            return sd.query_devices(device, kind="input")["default_samplerate"]
+        except (sd.PortAudioError, ValueError):
+            return None
+
     def start(self):
         self.thread.start()
 
+    def _block_start_time(self, now, frames, time_info):
+        """
+        Monotonic capture time of a block's first sample: PortAudio's ADC
+        time mapped onto time.monotonic(), or (when the host API does not
+        report it, or for fake microphones) the callback time minus the
+        block length.
+        """
+        adc = getattr(time_info, "inputBufferAdcTime", 0.0)
+        stream_now = getattr(time_info, "currentTime", 0.0)
+        if adc and stream_now:
+            return now - (stream_now - adc)
+        return now - frames / self.capture_rate
+
     def _audio_loop(self):
         global audio_laughter_score
 
         def callback(indata, frames, time_info, status):
-            x = indata[:, 0]
-
-            if frames >= len(self.audio_buffer):
-                self.audio_buffer[:] = x[-len(self.audio_buffer):]
-                return
-
-            self.audio_buffer = np.roll(self.audio_buffer, -frames)
-            self.audio_buffer[-frames:] = x
-
-        with sd.InputStream(
-            samplerate=self.sample_rate,
+            if status:
+                METRICS.inc("audio_overflows")
+
+            self.last_block_time = time.monotonic()
+            if self.block_sink is not None:
+                self.block_sink(indata, self._block_start_time(self.last_block_time, frames, time_info))
+            x = self.resampler.process(indata[:, 0])
+            if self.gate is not None:
+                self.gate.update(x)
+            self.ring.write(x)
+
+        with self.stream_factory(
+            samplerate=self.capture_rate,
             channels=1,
             dtype="float32",
-            callback=callback
+            callback=callback,
+            **({"device": self.device} if self.device is not None else {})
         ):
             while True:
+                if self.gate is not None and not self.gate.is_open:
+                    self.laughter_score = 0.0
+                    audio_laughter_score = 0.0
+                    self.skipped_invocations += 1
+                    METRICS.inc("audio_skipped")
+                    time.sleep(0.5)
+                    continue
+
+                t0 = METRICS.start()
+                newest = self.last_block_time
+                self.ring.read_into(self.audio_buffer)
                 self.interpreter.set_tensor(
                     self.input_details["index"],
                     self.audio_buffer
@@ -65,8 +144,19 @@ class YamnetAudio:
 
                 # AudioSet: 0=Laughter, 1=Giggle, 2=Chuckle
                 laughter_prob = scores[0] + scores[1] + scores[2]
-                audio_laughter_score = float(
+                self.laughter_score = float(
                     max(0.0, min(laughter_prob, 1.0))
                 )
+                audio_laughter_score = self.laughter_score
+
+                self.executed_invocations += 1
+                METRICS.observe("audio_invoke", t0)
+                METRICS.inc("audio_inferences")
+                if newest is not None:
+                    # Age of the newest scored sample when its score is published
+                    METRICS.set_gauge(
+                        "audio_lag_ms",
+                        (time.monotonic() - newest) * 1000.0
+                    )
 
                 time.sleep(0.5)
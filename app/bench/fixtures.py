@@ -0,0 +1,255 @@
+"""
+Deterministic synthetic fixtures for benchmarks and headless runs.
+
+Nothing here needs a camera, microphone or network: landmarks follow
+MediaPipe's 478-point layout, frames are generated images, audio is
+noise or laugh-like bursts, and the database is built from scratch.
+"""
+import math
+import random
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from face.facial_features import (
+    UPPER_LIP, LOWER_LIP, LEFT_MOUTH, RIGHT_MOUTH,
+    LEFT_EYE_UPPER, LEFT_EYE_LOWER, LEFT_EYE_LEFT, LEFT_EYE_RIGHT,
+    RIGHT_EYE_UPPER, RIGHT_EYE_LOWER, RIGHT_EYE_LEFT, RIGHT_EYE_RIGHT,
+)
+from face.roi import Landmark
+
+NUM_LANDMARKS = 478
+SAMPLE_RATE = 16000
+
+CATEGORIES = ["animals", "fails", "pranks", "memes", "reaction_humor", "ai_powered", "romanian"]
+
+# Same DDL as the lab database (Video has category_id/harvest_query)
+SCHEMA = """
+CREATE TABLE "Subject" (
+    sid INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    age INTEGER,
+    gender VARCHAR(20),
+    PRIMARY KEY (sid)
+);
+CREATE TABLE "Category" (
+    cid INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    PRIMARY KEY (cid),
+    UNIQUE (name)
+);
+CREATE TABLE "Experiment" (
+    eid INTEGER NOT NULL,
+    sid INTEGER NOT NULL,
+    type VARCHAR(6) NOT NULL,
+    total_score FLOAT,
+    PRIMARY KEY (eid),
+    FOREIGN KEY(sid) REFERENCES "Subject" (sid) ON DELETE CASCADE
+);
+CREATE TABLE Video (
+    vid         VARCHAR(32)    PRIMARY KEY,
+    link        VARCHAR(2048)  NOT NULL,
+    duration    INTEGER        NOT NULL,
+    status      TEXT           NOT NULL DEFAULT 'n/a'
+        CHECK (status IN ('approved','denied','n/a')),
+    category_id INTEGER        NOT NULL, harvest_query TEXT,
+    CONSTRAINT fk_video_category
+        FOREIGN KEY (category_id)
+            REFERENCES Category(cid)
+            ON UPDATE CASCADE
+            ON DELETE RESTRICT
+);
+CREATE TABLE "ExperimentVideo" (
+    eid   INTEGER NOT NULL,
+    vid   VARCHAR(32) NOT NULL,
+    score FLOAT,
+    PRIMARY KEY (eid, vid),
+    FOREIGN KEY(eid) REFERENCES "Experiment"(eid) ON DELETE CASCADE,
+    FOREIGN KEY(vid) REFERENCES "Video"(vid) ON DELETE CASCADE
+);
+"""
+
+
+# ---------- Landmarks ----------
+def _base_face(rng):
+    """Neutral face: points on a face oval plus the feature landmarks."""
+    angles = rng.uniform(0, 2 * math.pi, NUM_LANDMARKS)
+    radii = np.sqrt(rng.uniform(0, 1, NUM_LANDMARKS))
+    pts = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    pts[:, 0] = 0.5 + 0.12 * radii * np.cos(angles)
+    pts[:, 1] = 0.5 + 0.16 * radii * np.sin(angles)
+    pts[:, 2] = rng.normal(0, 0.01, NUM_LANDMARKS)
+
+    fixed = {
+        UPPER_LIP: (0.500, 0.585), LOWER_LIP: (0.500, 0.600),
+        LEFT_MOUTH: (0.460, 0.592), RIGHT_MOUTH: (0.540, 0.592),
+        LEFT_EYE_UPPER: (0.445, 0.445), LEFT_EYE_LOWER: (0.445, 0.460),
+        LEFT_EYE_LEFT: (0.420, 0.452), LEFT_EYE_RIGHT: (0.470, 0.452),
+        RIGHT_EYE_UPPER: (0.555, 0.445), RIGHT_EYE_LOWER: (0.555, 0.460),
+        RIGHT_EYE_LEFT: (0.530, 0.452), RIGHT_EYE_RIGHT: (0.580, 0.452),
+    }
+    for idx, (x, y) in fixed.items():
+        pts[idx, 0] = x
+        pts[idx, 1] = y
+    return pts
+
+
+def landmark_array(n_frames=300, seed=0, faces=1):
+    """
+    float32 array [n_frames, faces, 478, 3] of normalized landmarks.
+    The face smiles/laughs periodically and jitters slightly.
+    """
+    rng = np.random.RandomState(seed)
+    out = np.empty((n_frames, faces, NUM_LANDMARKS, 3), dtype=np.float32)
+
+    for f in range(faces):
+        base = _base_face(rng)
+        base[:, 0] += (f - (faces - 1) / 2.0) * 0.3     # spread faces horizontally
+        phase = rng.uniform(0, 2 * math.pi)
+
+        for t in range(n_frames):
+            smile = max(0.0, math.sin(2 * math.pi * t / 90.0 + phase))
+            pts = base + rng.normal(0, 0.0008, base.shape).astype(np.float32)
+
+            pts[LEFT_MOUTH, 0] -= 0.012 * smile
+            pts[RIGHT_MOUTH, 0] += 0.012 * smile
+            pts[LOWER_LIP, 1] += 0.020 * smile
+            for idx in (LEFT_EYE_UPPER, RIGHT_EYE_UPPER):
+                pts[idx, 1] += 0.004 * smile
+            out[t, f] = pts
+
+    return out
+
+
+def landmark_frames(n_frames=300, seed=0):
+    """Single-face landmarks as lists of Landmark tuples (MediaPipe-like objects)."""
+    arr = landmark_array(n_frames, seed)[:, 0]
+    return [
+        [Landmark(float(x), float(y), float(z)) for x, y, z in frame]
+        for frame in arr
+    ]
+
+
+# ---------- Frames ----------
+def synthetic_frames(n_frames=60, width=640, height=480, seed=0):
+    """BGR uint8 frames: noisy background with a moving bright face-like ellipse."""
+    import cv2
+
+    rng = np.random.RandomState(seed)
+    frames = []
+    for t in range(n_frames):
+        frame = rng.randint(0, 40, (height, width, 3), dtype=np.uint8)
+        cx = int(width / 2 + 20 * math.sin(t / 15.0))
+        cy = int(height / 2 + 10 * math.cos(t / 20.0))
+        cv2.ellipse(frame, (cx, cy), (width // 8, height // 5), 0, 0, 360, (150, 180, 220), -1)
+        cv2.circle(frame, (cx - width // 24, cy - height // 16), 6, (40, 40, 40), -1)
+        cv2.circle(frame, (cx + width // 24, cy - height // 16), 6, (40, 40, 40), -1)
+        cv2.ellipse(frame, (cx, cy + height // 12), (width // 30, 4 + t % 8), 0, 0, 360, (40, 40, 120), -1)
+        frames.append(frame)
+    return frames
+
+
+# ---------- Audio ----------
+def synthetic_audio(seconds=5.0, kind="laugh", sample_rate=SAMPLE_RATE, seed=0):
+    """
+    float32 mono audio in [-1, 1].
+    kind="noise": low-level room noise.
+    kind="laugh": room noise plus ~5 Hz voiced bursts ("ha-ha-ha").
+    """
+    rng = np.random.RandomState(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n, dtype=np.float32) / sample_rate
+    audio = rng.normal(0, 0.005, n).astype(np.float32)
+
+    if kind == "laugh":
+        f0 = 220.0 + 30.0 * np.sin(2 * np.pi * 0.7 * t)
+        voiced = sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(1, 6))
+        envelope = np.clip(np.sin(2 * np.pi * 5.0 * t), 0.0, None) ** 2
+        # laugh episodes: 1.5 s on, 1 s off
+        episodes = ((t % 2.5) < 1.5).astype(np.float32)
+        audio += (0.25 * voiced * envelope * episodes).astype(np.float32)
+    elif kind != "noise":
+        raise ValueError(f"Unknown audio kind: {kind}")
+
+    return np.clip(audio, -1.0, 1.0)
+
+
+# ---------- Database ----------
+def copy_database(src, dst):
+    """Consistent copy of the SQLite DB at `src` (opened read-only) to `dst`."""
+    dst = Path(dst)
+    source = sqlite3.connect(f"file:{src}?mode=ro", uri=True)
+    target = sqlite3.connect(str(dst))
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    return dst
+
+
+def build_database(path, n_videos=100_000, n_subjects=200, videos_per_experiment=12, seed=0):
+    """
+    Creates a lab-schema SQLite DB at `path` with `n_videos` videos,
+    one experiment per subject and scored ExperimentVideo rows.
+    """
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO Category (cid, name) VALUES (?, ?)",
+            [(i + 1, name) for i, name in enumerate(CATEGORIES)]
+        )
+
+        statuses = ["approved"] * 6 + ["denied"] * 2 + ["n/a"] * 2
+        videos = []
+        for i in range(n_videos):
+            vid = f"v{i:010d}"
+            videos.append((
+                vid,
+                f"https://www.youtube.com/watch?v={vid}",
+                rng.randint(5, 70),
+                rng.choice(statuses),
+                rng.randint(1, len(CATEGORIES)),
+                "synthetic"
+            ))
+        conn.executemany(
+            "INSERT INTO Video (vid, link, duration, status, category_id, harvest_query) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            videos
+        )
+
+        for sid in range(1, n_subjects + 1):
+            conn.execute(
+                "INSERT INTO Subject (sid, name, age, gender) VALUES (?, ?, ?, ?)",
+                (sid, f"subject-{sid}", rng.randint(18, 60), rng.choice(["Male", "Female", "Other"]))
+            )
+            conn.execute(
+                "INSERT INTO Experiment (eid, sid, type, total_score) VALUES (?, ?, 'single', ?)",
+                (sid, sid, rng.random() * 0.5)
+            )
+            picked = rng.sample(range(n_videos), min(videos_per_experiment, n_videos))
+            conn.executemany(
+                "INSERT INTO ExperimentVideo (eid, vid, score) VALUES (?, ?, ?)",
+                [(sid, videos[i][0], rng.random() * 0.6) for i in picked]
+            )
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Tables that only exist in the ORM models are created on top
+    from sqlalchemy import create_engine
+    from persistence.models import Base
+
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    return path
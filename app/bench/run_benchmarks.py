@@ -0,0 +1,302 @@
+"""
+Pipeline micro-benchmarks.
+
+Run from the app/ directory:
+    python -m bench.run_benchmarks                      # run + print
+    python -m bench.run_benchmarks --save baseline.json
+    python -m bench.run_benchmarks --compare baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench import fixtures
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.15      # 15% slower than baseline counts as a regression
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers a setup function returning (fn, ops_per_call)."""
+    def wrap(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return wrap
+
+
+# ---------- Face / features ----------
+@benchmark("features.update")
+def bench_features(ctx):
+    from face.facial_features import FacialFeatureExtractor
+
+    frames = fixtures.landmark_frames(300)
+
+    def run():
+        fx = FacialFeatureExtractor(baseline_frames=60)
+        for lm in frames:
+            fx.update(lm, 1280, 720)
+    return run, len(frames)
+
+
+@benchmark("features.group_update")
+def bench_group_features(ctx):
+    from face.facial_features import GROUP_LANDMARKS, GroupFeatureExtractor, landmarks_to_array
+    from face.roi import Landmark
+
+    arr = fixtures.landmark_array(100, faces=4)
+    frames = [
+        [[Landmark(float(x), float(y), float(z)) for x, y, z in face] for face in frame]
+        for frame in arr
+    ]
+    face_ids = [0, 1, 2, 3]
+
+    def run():
+        fx = GroupFeatureExtractor(baseline_frames=60)
+        for faces in frames:
+            fx.update(landmarks_to_array(faces, GROUP_LANDMARKS), face_ids, 1280, 720)
+    return run, len(frames)
+
+
+@benchmark("geometry.eye_aperture")
+def bench_geometry(ctx):
+    from utils.geometry import dist, eye_aperture
+
+    pts = [((10.0 + i, 20.0), (10.0 + i, 26.0), (0.0, 23.0), (20.0, 23.0)) for i in range(1000)]
+
+    def run():
+        for u, l, a, b in pts:
+            eye_aperture(u, l, a, b)
+            dist(a, b)
+    return run, len(pts)
+
+
+@benchmark("smoothing.ema")
+def bench_ema(ctx):
+    from utils.smoothing import EMASmoother
+
+    values = [i % 17 / 17.0 for i in range(10000)]
+
+    def run():
+        s = EMASmoother(alpha=0.3)
+        for v in values:
+            s.update(v)
+    return run, len(values)
+
+
+@benchmark("scorer.compute")
+def bench_scorer(ctx):
+    from scoring.scorer import AmusementScorer
+
+    scorer = AmusementScorer()
+    values = [(i % 7 / 7.0, i % 5 / 5.0, i % 3 / 3.0, i % 11 / 11.0) for i in range(10000)]
+
+    def run():
+        for a, b, c, d in values:
+            scorer.compute(au25=a, au12=b, au6=c, audio=d)
+    return run, len(values)
+
+
+# ---------- Logging ----------
+@benchmark("logger.try_log")
+def bench_logger(ctx):
+    from logger.text_logger import TextLogger
+
+    logger = TextLogger(file_path=str(ctx["tmp"] / "bench_log.txt"))
+    logger.write_header({"name": "bench", "age": 30, "gender": "Other"})
+
+    def run():
+        for i in range(1000):
+            logger.try_log(
+                timestamp=i / 30.0, video_id="v0000000001",
+                au25=0.1, au12=0.2, au6=0.3, audio=0.4,
+                smile=0.25, laughter=0.3, amusement=0.28
+            )
+    return run, 1000
+
+
+# ---------- Database ----------
+@benchmark("playlist.get_random_playlist")
+def bench_playlist(ctx):
+    from sqlalchemy import create_engine
+    from persistence.db import SessionLocal
+    from playlist.manager import get_random_playlist
+
+    SessionLocal.configure(bind=create_engine(f"sqlite:///{ctx['db']}", future=True))
+
+    def run():
+        get_random_playlist()
+    return run, 1
+
+
+@benchmark("playlist.scored_playlist")
+def bench_scored_playlist(ctx):
+    from sqlalchemy import create_engine
+    from persistence.db import SessionLocal
+    from playlist.sampler import ScoreAwareSampler
+
+    SessionLocal.configure(bind=create_engine(f"sqlite:///{ctx['db']}", future=True))
+    sampler = ScoreAwareSampler("ucb")
+
+    def run():
+        for _ in range(100):
+            sampler.playlist()
+    return run, 100
+
+
+@benchmark("video_stats.top_videos")
+def bench_top_videos(ctx):
+    from sqlalchemy import create_engine
+    from persistence.db import SessionLocal, init_db
+    from persistence.video_stats import backfill_video_stats, top_videos
+
+    SessionLocal.configure(bind=create_engine(f"sqlite:///{ctx['db']}", future=True))
+    init_db()   # a copied lab DB (--db) may predate VideoStats
+    backfill_video_stats()
+    category = fixtures.CATEGORIES[0]
+    if not top_videos(category):
+        raise RuntimeError(f"top_videos({category!r}) returned no rows")
+
+    def run():
+        for name in fixtures.CATEGORIES:
+            top_videos(name)
+    return run, len(fixtures.CATEGORIES)
+
+
+@benchmark("server.admin_get_next_video")
+def bench_admin_next(ctx):
+    import web.server as server
+
+    server.DB_PATH = str(ctx["db"])
+
+    def run():
+        for _ in range(10):
+            server.admin_get_next_video(only_na=True)
+    return run, 10
+
+
+@benchmark("harvest.insert_video")
+def bench_harvest(ctx):
+    import sqlite3
+    from harvest_to_db import COMMIT_EVERY, insert_video
+
+    counter = [0]
+
+    def run():
+        conn = sqlite3.connect(str(ctx["db"]))
+        try:
+            for i in range(500):
+                counter[0] += 1
+                vid = f"h{counter[0]:010d}"
+                insert_video(conn, vid, f"https://www.youtube.com/watch?v={vid}", 30, 1, "bench")
+                if i % COMMIT_EVERY == COMMIT_EVERY - 1:
+                    conn.commit()
+            conn.commit()
+        finally:
+            conn.close()
+    return run, 500
+
+
+# ---------- Runner ----------
+def time_benchmark(setup, ctx, repeats):
+    fn, ops = setup(ctx)
+    fn()  # warm-up
+
+    per_op = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        per_op.append((time.perf_counter() - t0) / ops * 1e6)
+
+    return {
+        "ops": ops,
+        "min_us": min(per_op),
+        "median_us": statistics.median(per_op),
+        "repeats": repeats,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns the names of benchmarks slower than baseline by more than threshold."""
+    regressions = []
+    print(f"\n{'benchmark':36s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, cur in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:36s} {'-':>12s} {cur['median_us']:12.2f}      new")
+            continue
+
+        change = cur["median_us"] / base["median_us"] - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:36s} {base['median_us']:12.2f} {cur['median_us']:12.2f} {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Amusement pipeline benchmarks")
+    parser.add_argument("--only", help="comma-separated benchmark names (prefix match)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--videos", type=int, default=100_000, help="videos in the generated DB")
+    parser.add_argument("--db", help="reuse an existing generated DB (benchmarks run on a temporary copy)")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    selected = BENCHMARKS
+    if args.only:
+        prefixes = [p.strip() for p in args.only.split(",") if p.strip()]
+        selected = {k: v for k, v in BENCHMARKS.items() if any(k.startswith(p) for p in prefixes)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        ctx = {"tmp": tmp}
+
+        if args.db:
+            # Benchmarks insert rows: never touch the given database itself
+            print(f"Copying {args.db}...")
+            ctx["db"] = fixtures.copy_database(args.db, tmp / "bench.db")
+        else:
+            print(f"Building synthetic DB ({args.videos} videos)...")
+            ctx["db"] = fixtures.build_database(tmp / "bench.db", n_videos=args.videos)
+
+        results = {}
+        for name, setup in selected.items():
+            r = time_benchmark(setup, ctx, args.repeats)
+            results[name] = r
+            print(f"{name:36s} median {r['median_us']:12.2f} us/op   min {r['min_us']:12.2f} us/op")
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "videos": args.videos,
+        "results": results,
+    }
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
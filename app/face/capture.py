@@ -0,0 +1,154 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import cv2
+
+# ================= CONFIG =================
+
+TARGET_FPS = 30
+FPS_TOLERANCE = 0.9          # accept modes delivering >= 90% of the target
+MEASURE_SECONDS = 1.5        # measurement window per mode
+WARMUP_FRAMES = 5            # frames discarded after a mode switch
+
+# =========================================
+
+
+@dataclass
+class CaptureMode:
+    width: int
+    height: int
+    fps: int
+    fourcc: str = "MJPG"
+    buffer_size: int = 1
+
+    @property
+    def cost(self):
+        # Fewer pixels first; at equal size prefer YUYV (no JPEG decode)
+        return self.width * self.height, self.fourcc != "YUYV"
+
+
+@dataclass
+class CaptureReport:
+    mode: CaptureMode
+    width: int                # what the camera actually delivered
+    height: int
+    fourcc: str
+    fps: float                # measured delivery rate
+    latency_ms: float         # mean time cap.read() blocked
+
+    def __str__(self):
+        return (
+            f"{self.width}x{self.height} {self.fourcc} "
+            f"{self.fps:.1f} fps, read {self.latency_ms:.1f} ms "
+            f"(requested {self.mode.width}x{self.mode.height}@{self.mode.fps} {self.mode.fourcc})"
+        )
+
+
+# (width, height, fourcc); cheapest first after sorting by CaptureMode.cost
+CANDIDATE_FORMATS = [
+    (640, 360, "YUYV"),
+    (640, 360, "MJPG"),
+    (640, 480, "YUYV"),
+    (640, 480, "MJPG"),
+    (1280, 720, "MJPG"),
+]
+
+
+def candidate_modes(fps: float = TARGET_FPS) -> List[CaptureMode]:
+    return [CaptureMode(w, h, int(round(fps)), fourcc) for w, h, fourcc in CANDIDATE_FORMATS]
+
+
+def fourcc_name(value: float) -> str:
+    code = int(value)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def apply_mode(cap, mode: CaptureMode) -> None:
+    # FOURCC must go first: some backends reset size/fps on a format change
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode.fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode.width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode.height)
+    cap.set(cv2.CAP_PROP_FPS, mode.fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, mode.buffer_size)
+
+
+def current_mode(cap) -> CaptureMode:
+    """The capture properties currently applied (to restore them later)."""
+    return CaptureMode(
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        int(round(cap.get(cv2.CAP_PROP_FPS))),
+        fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+        int(cap.get(cv2.CAP_PROP_BUFFERSIZE))
+    )
+
+
+def measure_capture(cap, mode: CaptureMode, seconds: float = MEASURE_SECONDS) -> Optional[CaptureReport]:
+    """Read frames for `seconds` and report the delivered rate and read latency."""
+    frame = None
+    for _ in range(WARMUP_FRAMES):
+        ok, frame = cap.read(frame)
+        if not ok:
+            return None
+
+    frames = 0
+    blocked = 0.0
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        t0 = time.monotonic()
+        ok, frame = cap.read(frame)
+        blocked += time.monotonic() - t0
+        if not ok:
+            return None
+        frames += 1
+
+    elapsed = time.monotonic() - start
+    h, w = frame.shape[:2]
+
+    return CaptureReport(
+        mode=mode,
+        width=w,
+        height=h,
+        fourcc=fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+        fps=frames / elapsed if elapsed > 0 else 0.0,
+        latency_ms=1000.0 * blocked / frames if frames else 0.0
+    )
+
+
+def negotiate_capture(
+    camera_index: int = 0,
+    target_fps: float = TARGET_FPS,
+    modes: Optional[List[CaptureMode]] = None,
+    seconds: float = MEASURE_SECONDS
+):
+    """
+    Opens the camera and tries the candidate modes from cheapest to most
+    expensive, measuring each one. Keeps the first mode that meets the
+    target rate, otherwise the fastest one measured. Modes default to
+    candidate_modes(target_fps). If no mode can be measured, the camera's
+    original properties are restored.
+
+    Returns (cap, CaptureReport or None).
+    """
+    cap = cv2.VideoCapture(camera_index)
+    if not cap.isOpened():
+        raise RuntimeError("Cannot open webcam")
+
+    original = current_mode(cap)
+    best = None
+    for mode in sorted(modes or candidate_modes(target_fps), key=lambda m: m.cost):
+        apply_mode(cap, mode)
+        report = measure_capture(cap, mode, seconds)
+        if report is None:
+            continue
+
+        if report.fps >= target_fps * FPS_TOLERANCE:
+            return cap, report
+
+        if best is None or report.fps > best.fps:
+            best = report
+
+    apply_mode(cap, best.mode if best is not None else original)
+
+    return cap, best
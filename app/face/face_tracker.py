@@ -1,22 +1,168 @@
 import time
+import threading
 import cv2
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 
+from face.roi import ROI_INPUT_SIZE, Landmark, RoiLandmarks, face_roi, landmark_points
+from face.keyframes import LandmarkPropagator
+from utils.assets import load_asset
+from utils.metrics import METRICS
+
+
+class MirroredLandmarks:
+    """Landmark sequence with x mirrored (x -> 1 - x), matching a flipped frame."""
+
+    def __init__(self, landmarks):
+        self.landmarks = landmarks
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def __getitem__(self, i):
+        lm = self.landmarks[i]
+        return Landmark(1.0 - lm.x, lm.y, lm.z)
+
+    def to_array(self, indices=None):
+        points = landmark_points(self.landmarks, indices)
+        points[:, 0] = 1.0 - points[:, 0]
+        return points
+
+    def __iter__(self):
+        for i in range(len(self.landmarks)):
+            yield self[i]
+
 
 class FaceTracker:
-    def __init__(self, model_path: str, camera_index: int = 0):
-        self.cap = cv2.VideoCapture(camera_index)
+    """
+    Webcam capture + MediaPipe face landmarks.
+
+    VIDEO mode (default) runs detect_for_video and blocks until the
+    landmarks for the current frame are ready.
+
+    LIVE_STREAM mode (live_stream=True) submits frames with detect_async
+    and returns the most recent finished result, so the caller can keep
+    rendering/logging while inference is in flight. Every submitted frame
+    is keyed by its capture timestamp; frames MediaPipe skips while busy
+    are counted in `dropped_frames`.
+
+    ROI tracking (roi_tracking=True) crops the padded face region found
+    in the previous frame, resizes it to roi_size x roi_size and runs the
+    landmarker on that. Landmarks are mapped back to full-frame normalized
+    coordinates. When the face is lost we fall back to a full-frame search.
+
+    Keyframe mode (keyframe_interval=N, VIDEO mode only) runs the landmarker
+    every N frames and follows the feature landmarks with optical
+    flow in between; large motion or drift forces an immediate re-detect.
+
+    num_faces > 1 (group experiments) tracks several faces per frame on the
+    full frame; read() still returns the first face and faces() returns
+    all of them. ROI and keyframe modes are single-face only.
+
+    Preprocessing writes into persistent buffers (cap.read / cv2 dst=),
+    so steady-state frames allocate no pixel memory. mp.Image copies the
+    pixels it is given, so the buffers can be reused while detect_async
+    is still running. With mirror_landmarks=True the camera frame is not
+    flipped at all: inference runs on the raw frame and landmark x
+    coordinates are mirrored instead, so callers see the same selfie
+    coordinates as before. display_frame() produces the mirrored picture
+    only when something actually needs to be shown.
+
+    native_format=True (with mirror_landmarks) asks the backend for the
+    camera's raw YUYV frames (CAP_PROP_CONVERT_RGB=0) and feeds RGB/gray
+    to the models straight from them; it reverts to BGR if the camera
+    does not deliver YUYV.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        camera_index: int = 0,
+        live_stream: bool = False,
+        roi_tracking: bool = False,
+        roi_size: int = ROI_INPUT_SIZE,
+        keyframe_interval: int = 0,
+        mirror_landmarks: bool = False,
+        native_format: bool = False,
+        cap=None,
+        num_faces: int = 1
+    ):
+        # An already configured capture (see face/capture.py) can be passed in
+        self.cap = cap if cap is not None else cv2.VideoCapture(camera_index)
         if not self.cap.isOpened():
             raise RuntimeError("Cannot open webcam")
 
+        self.live_stream = live_stream
+
+        # ---- Persistent preprocessing buffers ----
+        self.mirror_landmarks = mirror_landmarks
+        self.native_format = native_format and mirror_landmarks
+        self._yuyv = None               # decided on the first frame
+        self._raw = None
+        self._bgr = None
+        self._flipped = None
+        self._display = None
+        self._rgb = None
+        self._crop = None
+        self._crop_rgb = None
+        self._gray = [None, None]       # double-buffered: the propagator keeps the previous one
+        self._gray_idx = 0
+
+        if self.native_format:
+            self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+        if keyframe_interval and live_stream:
+            raise ValueError("Keyframe propagation requires VIDEO mode")
+        if num_faces > 1 and (roi_tracking or keyframe_interval):
+            raise ValueError("ROI tracking and keyframe propagation support a single face only")
+
+        self.num_faces = num_faces
+
+        # ---- Keyframe propagation ----
+        self.propagator = (
+            LandmarkPropagator(interval=keyframe_interval)
+            if keyframe_interval
+            else None
+        )
+
+        # ---- ROI tracking ----
+        self.roi_tracking = roi_tracking
+        self.roi_size = roi_size
+        self.roi = None                 # (x0, y0, x1, y1) in full-frame pixels
+        self.roi_frames = 0
+        self.full_frames = 0
+
+        # ---- LIVE_STREAM bookkeeping (written by the MediaPipe callback thread) ----
+        self._lock = threading.Lock()
+        self._pending = {}              # capture timestamp_ms -> (w, h, roi)
+        self.latest_landmarks = None
+        self.latest_faces = []
+        self.latest_timestamp_ms = None  # capture time of the frame latest_landmarks belong to
+        self.frame_timestamp_ms = None   # capture time of the frame returned by read()
+        self.capture_time = None         # time.monotonic() right after cap.read() of that frame
+        # False when read() returned the same LIVE_STREAM result as the previous read()
+        self.fresh = False
+        self._read_result_ms = None
+        self.submitted_frames = 0
+        self.completed_frames = 0
+        self.dropped_frames = 0
+
+        if live_stream:
+            running_mode = vision.RunningMode.LIVE_STREAM
+            extra = {"result_callback": self._on_result}
+        else:
+            running_mode = vision.RunningMode.VIDEO
+            extra = {}
+
         self.options = vision.FaceLandmarkerOptions(
             base_options=python.BaseOptions(
-                model_asset_path=model_path
+                # Shared bytes: trackers of several stations load the file once
+                model_asset_buffer=load_asset(model_path)
             ),
-            running_mode=vision.RunningMode.VIDEO,
-            num_faces=1
+            running_mode=running_mode,
+            num_faces=num_faces,
+            **extra
         )
 
         self.landmarker = vision.FaceLandmarker.create_from_options(
@@ -24,34 +170,217 @@ class FaceTracker:
         )
 
         self.start_time = time.time()
+        self._last_timestamp_ms = -1
 
-    def read(self):
-        ret, frame = self.cap.read()
+    def _next_timestamp_ms(self):
+        # MediaPipe rejects timestamps that do not strictly increase
+        timestamp_ms = int((time.time() - self.start_time) * 1000)
+        if timestamp_ms <= self._last_timestamp_ms:
+            timestamp_ms = self._last_timestamp_ms + 1
+        self._last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def _grab(self):
+        """Read the next camera frame into persistent buffers (BGR, or None)."""
+        ret, raw = self.cap.read(self._raw)
         if not ret:
-            return None, None, None
+            return None
+        self.capture_time = time.monotonic()
+        self._raw = raw
+
+        if self._yuyv is None:
+            self._yuyv = self.native_format and raw.ndim == 3 and raw.shape[2] == 2
+            if self.native_format and not self._yuyv:
+                # Backend gave us something other than YUYV (e.g. raw MJPG bytes)
+                self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+                self._raw = None
+                return self._grab()
 
-        frame = cv2.flip(frame, 1)
-        h, w, _ = frame.shape
+        if self._yuyv:
+            self._bgr = cv2.cvtColor(raw, cv2.COLOR_YUV2BGR_YUY2, dst=self._bgr)
+            frame = self._bgr
+        else:
+            frame = raw
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(
+        if self.mirror_landmarks:
+            return frame
+
+        self._flipped = cv2.flip(frame, 1, dst=self._flipped)
+        return self._flipped
+
+    def _to_gray(self, frame):
+        self._gray_idx ^= 1
+        buf = self._gray[self._gray_idx]
+        if self._yuyv:
+            buf = cv2.cvtColor(self._raw, cv2.COLOR_YUV2GRAY_YUY2, dst=buf)
+        else:
+            buf = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buf)
+        self._gray[self._gray_idx] = buf
+        return buf
+
+    def _to_image(self, frame, roi):
+        if roi is None:
+            self.full_frames += 1
+            if self._yuyv:
+                self._rgb = cv2.cvtColor(self._raw, cv2.COLOR_YUV2RGB_YUY2, dst=self._rgb)
+            else:
+                self._rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            rgb = self._rgb
+        else:
+            self.roi_frames += 1
+            x0, y0, x1, y1 = roi
+            self._crop = cv2.resize(
+                frame[y0:y1, x0:x1],
+                (self.roi_size, self.roi_size),
+                dst=self._crop,
+                interpolation=cv2.INTER_AREA
+            )
+            self._crop_rgb = cv2.cvtColor(self._crop, cv2.COLOR_BGR2RGB, dst=self._crop_rgb)
+            rgb = self._crop_rgb
+
+        return mp.Image(
             image_format=mp.ImageFormat.SRGB,
             data=rgb
         )
 
-        timestamp_ms = int((time.time() - self.start_time) * 1000)
+    def _output(self, landmarks):
+        """Landmarks as seen by callers (selfie/mirrored coordinates)."""
+        if self.mirror_landmarks and landmarks is not None:
+            return MirroredLandmarks(landmarks)
+        return landmarks
+
+    def display_frame(self, frame):
+        """Mirrored view of a frame returned by read(), for on-screen display."""
+        if not self.mirror_landmarks:
+            return frame
+        self._display = cv2.flip(frame, 1, dst=self._display)
+        return self._display
+
+    def _faces_from(self, result, roi, w, h):
+        """All faces of a result in full-frame coordinates."""
+        if roi is None:
+            return list(result.face_landmarks)
+        return [RoiLandmarks(face, roi, w, h) for face in result.face_landmarks]
+
+    def _next_roi(self, landmarks, w, h):
+        if not self.roi_tracking or landmarks is None:
+            return None
+        return face_roi(landmarks, w, h)
+
+    def read(self):
+        t0 = METRICS.start()
+        frame = self._grab()
+        METRICS.observe("camera_read", t0)
+        if frame is None:
+            METRICS.inc("camera_read_failures")
+            return None, None, None
+
+        timestamp_ms = self._next_timestamp_ms()
+        self.frame_timestamp_ms = timestamp_ms
+
+        h, w = frame.shape[:2]
+
+        if self.live_stream:
+            with self._lock:
+                roi = self.roi
+                self._pending[timestamp_ms] = (w, h, roi)
+                self.submitted_frames += 1
+
+            t0 = METRICS.start()
+            self.landmarker.detect_async(self._to_image(frame, roi), timestamp_ms)
+            METRICS.observe("landmarks_submit", t0)
+
+            with self._lock:
+                landmarks = self.latest_landmarks
+                result_ms = self.latest_timestamp_ms
+
+            # Each result is one observation: callers skip feature updates when stale
+            self.fresh = result_ms is not None and result_ms != self._read_result_ms
+            self._read_result_ms = result_ms
+            return frame, self._output(landmarks), (w, h)
+
+        self.fresh = True
+
+        gray = None
+        if self.propagator is not None:
+            t0 = METRICS.start()
+            gray = self._to_gray(frame)
+            landmarks = self.propagator.propagate(gray, w, h)
+            METRICS.observe("landmarks_flow", t0)
+            if landmarks is not None:
+                self.latest_landmarks = landmarks
+                self.latest_faces = [landmarks]
+                self.latest_timestamp_ms = timestamp_ms
+                return frame, self._output(landmarks), (w, h)
+
+        t0 = METRICS.start()
+        roi = self.roi
         result = self.landmarker.detect_for_video(
-            mp_image,
+            self._to_image(frame, roi),
             timestamp_ms
         )
+        faces = self._faces_from(result, roi, w, h)
 
-        landmarks = (
-            result.face_landmarks[0]
-            if result.face_landmarks
-            else None
-        )
+        if not faces and roi is not None:
+            # Tracking lost: search the whole frame before giving up
+            roi = None
+            result = self.landmarker.detect_for_video(
+                self._to_image(frame, None),
+                self._next_timestamp_ms()
+            )
+            faces = self._faces_from(result, None, w, h)
+        METRICS.observe("landmarks", t0)
+
+        landmarks = faces[0] if faces else None
+
+        self.roi = self._next_roi(landmarks, w, h)
+        if self.propagator is not None:
+            self.propagator.reset(gray, landmarks, w, h)
+
+        self.latest_landmarks = landmarks
+        self.latest_faces = faces
+        self.latest_timestamp_ms = timestamp_ms
+
+        return frame, self._output(landmarks), (w, h)
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        with self._lock:
+            # Results arrive in timestamp order, so anything still pending
+            # from before this frame was skipped by MediaPipe.
+            stale = [ts for ts in self._pending if ts < timestamp_ms]
+            for ts in stale:
+                del self._pending[ts]
+            self.dropped_frames += len(stale)
+            METRICS.inc("landmark_frames_dropped", len(stale))
+
+            pending = self._pending.pop(timestamp_ms, None)
+            if pending is None:
+                return
+
+            w, h, roi = pending
+            faces = self._faces_from(result, roi, w, h)
+            landmarks = faces[0] if faces else None
+
+            # A miss inside the ROI drops back to full-frame search next frame
+            self.roi = self._next_roi(landmarks, w, h)
+
+            self.completed_frames += 1
+            self.latest_landmarks = landmarks
+            self.latest_faces = faces
+            self.latest_timestamp_ms = timestamp_ms
+
+    def faces(self):
+        """All faces found for the last read(), in the same coordinates as read()."""
+        with self._lock:
+            faces = list(self.latest_faces)
+        return [self._output(face) for face in faces]
 
-        return frame, landmarks, (w, h)
+    def result_lag_ms(self):
+        """Age of the landmarks returned by the last read(), in ms."""
+        if self.frame_timestamp_ms is None or self.latest_timestamp_ms is None:
+            return None
+        return self.frame_timestamp_ms - self.latest_timestamp_ms
 
     def release(self):
         self.cap.release()
+        self.landmarker.close()
@@ -1,3 +1,8 @@
+from collections import namedtuple
+
+import numpy as np
+
+from face.roi import landmark_points
 from utils.geometry import dist, eye_aperture
 
 # ---------- Landmark indices ----------
@@ -16,6 +21,27 @@ RIGHT_EYE_LOWER = 374
 RIGHT_EYE_LEFT = 362
 RIGHT_EYE_RIGHT = 263
 
+# Every landmark the extractor reads (used by trackers that only follow a subset)
+FEATURE_LANDMARKS = (
+    UPPER_LIP, LOWER_LIP, LEFT_MOUTH, RIGHT_MOUTH,
+    LEFT_EYE_UPPER, LEFT_EYE_LOWER, LEFT_EYE_LEFT, LEFT_EYE_RIGHT,
+    RIGHT_EYE_UPPER, RIGHT_EYE_LOWER, RIGHT_EYE_LEFT, RIGHT_EYE_RIGHT,
+)
+
+# ---------- Per-subject baseline cache ----------
+DRIFT_CHECK_FRAMES = 10      # frames compared against a cached baseline
+DRIFT_SIGMAS = 3.0           # allowed deviation in stored standard deviations...
+DRIFT_TOLERANCE = 0.15       # ...but never less than this relative change
+
+# A calibrated baseline in a form that survives sessions: the mouth width
+# is stored relative to the outer eye-corner span, so it does not depend
+# on how far the participant sits from the camera.
+BaselineStats = namedtuple("BaselineStats", [
+    "mouth_ratio", "mouth_ratio_var",
+    "eye_opening", "eye_opening_var",
+    "frame_width", "frame_height",
+])
+
 
 class FacialFeatureExtractor:
     """
@@ -23,6 +49,11 @@ class FacialFeatureExtractor:
     AU12 (lip corner puller),
     AU6  (cheek raiser via eye aperture).
     Handles baseline calibration internally.
+
+    A baseline from an earlier session can be passed to load_baseline():
+    it is used from the first frame and checked against the first
+    DRIFT_CHECK_FRAMES frames; if the participant (or the camera) changed
+    too much, calibration starts over.
     """
 
     def __init__(self, baseline_frames=60):
@@ -32,6 +63,86 @@ class FacialFeatureExtractor:
         self.baseline_mouth_width = None
         self.baseline_eye_opening = None
 
+        # Spread and scale, kept for the per-subject cache
+        self.baseline_mouth_ratio = None
+        self.baseline_mouth_ratio_var = 0.0
+        self.baseline_eye_opening_var = 0.0
+        self.frame_size = None
+
+        # "calibrating" -> "calibrated", or "checking" -> "cached" / "refreshed"
+        self.baseline_source = "calibrating"
+        self.cached = None
+        self.check_frames = 0
+        self.check_sums = [0.0, 0.0, 0.0]   # mouth ratio, eye opening, eye span
+
+    @property
+    def calibrated(self):
+        return self.cached is None and self.baseline_counter >= self.baseline_frames
+
+    def load_baseline(self, stats):
+        """Start from a cached BaselineStats instead of calibrating."""
+        self.cached = stats
+        self.baseline_source = "checking"
+        self.check_frames = 0
+        self.check_sums = [0.0, 0.0, 0.0]
+
+    def baseline(self):
+        """The current baseline as BaselineStats (None until calibrated)."""
+        if not self.calibrated or self.baseline_mouth_ratio is None:
+            return None
+        return BaselineStats(
+            mouth_ratio=self.baseline_mouth_ratio,
+            mouth_ratio_var=self.baseline_mouth_ratio_var,
+            eye_opening=self.baseline_eye_opening,
+            eye_opening_var=self.baseline_eye_opening_var,
+            frame_width=self.frame_size[0],
+            frame_height=self.frame_size[1],
+        )
+
+    def _check_cached(self, mouth_width, eye_opening, eye_span, img_w, img_h):
+        c = self.cached
+        if self.check_frames == 0 and abs(c.frame_width * img_h - c.frame_height * img_w) > 0.01 * img_w * img_h:
+            # Different aspect ratio: another camera or mode, calibrate from scratch
+            self._drop_cached()
+            return
+        if eye_span <= 1e-6:
+            return
+
+        self.check_frames += 1
+        self.check_sums[0] += mouth_width / eye_span
+        self.check_sums[1] += eye_opening
+        self.check_sums[2] += eye_span
+        n = self.check_frames
+
+        # Use the cached baseline right away, scaled to the current face size
+        self.baseline_mouth_width = c.mouth_ratio * self.check_sums[2] / n
+        self.baseline_eye_opening = c.eye_opening
+        if n < DRIFT_CHECK_FRAMES:
+            return
+
+        def drifted(mean, cached, var):
+            return abs(mean - cached) > max(DRIFT_SIGMAS * var ** 0.5, DRIFT_TOLERANCE * abs(cached))
+
+        if drifted(self.check_sums[0] / n, c.mouth_ratio, c.mouth_ratio_var) or \
+                drifted(self.check_sums[1] / n, c.eye_opening, c.eye_opening_var):
+            self._drop_cached()
+            self.baseline_source = "refreshed"
+            return
+
+        self.baseline_mouth_ratio = c.mouth_ratio
+        self.baseline_mouth_ratio_var = c.mouth_ratio_var
+        self.baseline_eye_opening_var = c.eye_opening_var
+        self.baseline_counter = self.baseline_frames
+        self.baseline_source = "cached"
+        self.cached = None
+
+    def _drop_cached(self):
+        self.cached = None
+        self.baseline_source = "calibrating"
+        self.baseline_counter = 0
+        self.baseline_mouth_width = None
+        self.baseline_eye_opening = None
+
     def update(self, landmarks, img_w, img_h):
         """
         Update facial features for the current frame.
@@ -79,9 +190,39 @@ class FacialFeatureExtractor:
 
         eye_opening = (le_open + re_open) / 2.0
 
+        eye_span = dist(
+            (landmarks[LEFT_EYE_LEFT].x * img_w,
+             landmarks[LEFT_EYE_LEFT].y * img_h),
+            (landmarks[RIGHT_EYE_RIGHT].x * img_w,
+             landmarks[RIGHT_EYE_RIGHT].y * img_h),
+        )
+        self.frame_size = (img_w, img_h)
+
+        # ---- Cached baseline ----
+        if self.cached is not None:
+            self._check_cached(mouth_width, eye_opening, eye_span, img_w, img_h)
+
         # ---- Baseline calibration ----
-        if self.baseline_counter < self.baseline_frames:
+        if self.cached is None and self.baseline_counter < self.baseline_frames:
             self.baseline_counter += 1
+            if self.baseline_counter == self.baseline_frames and self.baseline_source == "calibrating":
+                self.baseline_source = "calibrated"
+
+            if self.baseline_eye_opening is None:
+                self.baseline_eye_opening_var = 0.0
+            else:
+                delta = eye_opening - self.baseline_eye_opening
+                self.baseline_eye_opening_var = 0.9 * (self.baseline_eye_opening_var + 0.1 * delta * delta)
+
+            if eye_span > 1e-6:
+                ratio = mouth_width / eye_span
+                if self.baseline_mouth_ratio is None or self.baseline_counter == 1:
+                    self.baseline_mouth_ratio = ratio
+                    self.baseline_mouth_ratio_var = 0.0
+                else:
+                    delta = ratio - self.baseline_mouth_ratio
+                    self.baseline_mouth_ratio += 0.1 * delta
+                    self.baseline_mouth_ratio_var = 0.9 * (self.baseline_mouth_ratio_var + 0.1 * delta * delta)
 
             self.baseline_mouth_width = (
                 mouth_width if self.baseline_mouth_width is None
@@ -114,3 +255,142 @@ class FacialFeatureExtractor:
             )
 
         return au25, au12, au6
+
+
+# Landmarks gathered per face in group mode: the feature points plus the
+# face oval extremes (forehead, chin, cheeks) that bound the face box
+FACE_OVAL_EXTREMES = (10, 152, 234, 454)
+GROUP_LANDMARKS = FEATURE_LANDMARKS + FACE_OVAL_EXTREMES
+
+# Distances the AUs are built from: mouth open / width, then per eye
+# vertical / horizontal aperture
+_PAIRS = (
+    (UPPER_LIP, LOWER_LIP), (LEFT_MOUTH, RIGHT_MOUTH),
+    (LEFT_EYE_UPPER, LEFT_EYE_LOWER), (LEFT_EYE_LEFT, LEFT_EYE_RIGHT),
+    (RIGHT_EYE_UPPER, RIGHT_EYE_LOWER), (RIGHT_EYE_LEFT, RIGHT_EYE_RIGHT),
+)
+_PAIR_A = np.array([a for a, _ in _PAIRS])
+_PAIR_B = np.array([b for _, b in _PAIRS])
+_GROUP_PAIR_A = np.array([GROUP_LANDMARKS.index(a) for a, _ in _PAIRS])
+_GROUP_PAIR_B = np.array([GROUP_LANDMARKS.index(b) for _, b in _PAIRS])
+
+
+def landmarks_to_array(faces, indices=None):
+    """
+    List of per-face landmark sequences -> float32 array [F, N, 3], with
+    all 478 landmarks or only `indices` (e.g. GROUP_LANDMARKS).
+    """
+    n = len(indices) if indices is not None else 478
+    if not faces:
+        return np.zeros((0, n, 3), dtype=np.float32)
+    return np.stack([landmark_points(face, indices) for face in faces])
+
+
+def pair_distances(points, img_w, img_h):
+    """
+    [F, 6] pixel distances of the _PAIRS for points in either layout:
+    all 478 landmarks or GROUP_LANDMARKS.
+    """
+    if points.shape[1] == len(GROUP_LANDMARKS):
+        a, b = _GROUP_PAIR_A, _GROUP_PAIR_B
+    else:
+        a, b = _PAIR_A, _PAIR_B
+    scale = np.array([img_w, img_h], dtype=np.float32)
+    diff = (points[:, a, :2] - points[:, b, :2]) * scale
+    return np.sqrt((diff * diff).sum(axis=2))
+
+
+def _ratio(num, den):
+    return np.where(den > 1e-6, num / np.maximum(den, 1e-6), 0.0)
+
+
+class GroupFeatureExtractor:
+    """
+    AU25/AU12/AU6 for several faces at once.
+
+    Features for all faces are computed in one vectorized pass over an
+    [F, N, 3] landmark array (N = 478, or GROUP_LANDMARKS for a cheap
+    gather); baseline calibration is kept per face id (ids come from
+    face.identity.FaceIdentityTracker) in slot arrays, so it is
+    vectorized too.
+    """
+
+    def __init__(self, baseline_frames=60):
+        self.baseline_frames = baseline_frames
+        self.slots = {}         # face id -> index into the baseline arrays
+        self.free = []
+        self.counter = np.zeros(0, dtype=np.int64)
+        self.base_mouth = np.zeros(0, dtype=np.float64)
+        self.base_eye = np.zeros(0, dtype=np.float64)
+
+    @property
+    def baselines(self):
+        """face id -> [counter, mouth_width, eye_opening]"""
+        return {
+            fid: [int(self.counter[i]), float(self.base_mouth[i]), float(self.base_eye[i])]
+            for fid, i in self.slots.items()
+        }
+
+    def forget(self, face_id):
+        slot = self.slots.pop(face_id, None)
+        if slot is not None:
+            self.free.append(slot)
+
+    def _slot(self, face_id):
+        slot = self.slots.get(face_id)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                slot = len(self.counter)
+                size = max(4, 2 * slot)
+                self.counter = np.resize(self.counter, size)
+                self.base_mouth = np.resize(self.base_mouth, size)
+                self.base_eye = np.resize(self.base_eye, size)
+                self.free.extend(range(size - 1, slot, -1))
+            self.counter[slot] = 0
+            self.slots[face_id] = slot
+        return slot
+
+    def update(self, points, face_ids, img_w, img_h):
+        """
+        points: [F, N, 3] normalized landmarks, face_ids: F ids.
+
+        Returns:
+            au25, au12, au6 as float arrays of shape [F]
+        """
+        dist = pair_distances(points, img_w, img_h)
+        mouth_open, mouth_width = dist[:, 0], dist[:, 1]
+        eye_opening = (_ratio(dist[:, 2], dist[:, 3]) + _ratio(dist[:, 4], dist[:, 5])) / 2.0
+
+        # ---- Baseline calibration (per face) ----
+        s = np.array([self._slot(fid) for fid in face_ids], dtype=np.intp)
+        counter = self.counter[s]
+        calibrating = counter < self.baseline_frames
+        first = counter == 0
+        mouth = np.where(first, mouth_width, 0.9 * self.base_mouth[s] + 0.1 * mouth_width)
+        eye = np.where(first, eye_opening, 0.9 * self.base_eye[s] + 0.1 * eye_opening)
+        base_mouth = np.where(calibrating, mouth, self.base_mouth[s])
+        base_eye = np.where(calibrating, eye, self.base_eye[s])
+        self.base_mouth[s] = base_mouth
+        self.base_eye[s] = base_eye
+        self.counter[s] = counter + calibrating
+
+        # ---- AU25 / AU12 / AU6 ----
+        au25 = _ratio(mouth_open, mouth_width)
+
+        ok_mouth = base_mouth > 1e-6
+        au12 = np.where(
+            ok_mouth,
+            np.maximum(0.0, (mouth_width - base_mouth) / np.where(ok_mouth, base_mouth, 1.0)),
+            0.0
+        )
+
+        ok_eye = base_eye > 1e-6
+        au6 = np.where(
+            ok_eye,
+            np.maximum(0.0, (base_eye - eye_opening) / np.where(ok_eye, base_eye, 1.0)),
+            0.0
+        )
+
+        return au25, au12, au6
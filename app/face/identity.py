@@ -0,0 +1,99 @@
+import numpy as np
+
+IOU_THRESHOLD = 0.3          # minimum overlap to continue a track
+MAX_CENTROID_DIST = 0.15     # fallback match radius (normalized units)
+MAX_MISSING_FRAMES = 30      # keep a lost face's id this long
+
+
+def boxes_from_points(points):
+    """[F, N, 3] normalized landmarks -> [F, 4] boxes (xmin, ymin, xmax, ymax)."""
+    xy = points[:, :, :2]
+    return np.concatenate([xy.min(axis=1), xy.max(axis=1)], axis=1)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between boxes a [N, 4] and b [M, 4]."""
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-12), 0.0)
+
+
+class FaceIdentityTracker:
+    """
+    Gives faces stable ids across frames.
+
+    Greedy matching on box IoU, falling back to centroid distance for
+    fast movers. Unmatched detections get new ids; tracks that are not
+    seen for `max_missing` frames are retired (see `retired`).
+    """
+
+    def __init__(
+        self,
+        iou_threshold=IOU_THRESHOLD,
+        max_centroid_dist=MAX_CENTROID_DIST,
+        max_missing=MAX_MISSING_FRAMES
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_dist = max_centroid_dist
+        self.max_missing = max_missing
+
+        self.next_id = 1
+        self.tracks = {}        # id -> [box, missing_frames]
+        self.retired = []       # ids dropped by the last update()
+
+    def update(self, boxes):
+        """boxes: [F, 4] -> list of F face ids."""
+        self.retired = []
+        ids = [None] * len(boxes)
+        track_ids = list(self.tracks)
+
+        if track_ids and len(boxes):
+            prev = np.array([self.tracks[t][0] for t in track_ids])
+            iou = iou_matrix(np.asarray(boxes), prev)
+
+            centers = (np.asarray(boxes)[:, :2] + np.asarray(boxes)[:, 2:]) / 2.0
+            prev_centers = (prev[:, :2] + prev[:, 2:]) / 2.0
+            dist = np.linalg.norm(centers[:, None] - prev_centers[None, :], axis=2)
+
+            used = set()
+            # Best IoU pairs first
+            for flat in np.argsort(-iou, axis=None):
+                i, j = divmod(int(flat), len(track_ids))
+                if iou[i, j] < self.iou_threshold:
+                    break
+                if ids[i] is None and j not in used:
+                    ids[i] = track_ids[j]
+                    used.add(j)
+
+            # Then nearest centroids for whatever is left
+            for flat in np.argsort(dist, axis=None):
+                i, j = divmod(int(flat), len(track_ids))
+                if dist[i, j] > self.max_centroid_dist:
+                    break
+                if ids[i] is None and j not in used:
+                    ids[i] = track_ids[j]
+                    used.add(j)
+
+        for i, box in enumerate(boxes):
+            if ids[i] is None:
+                ids[i] = self.next_id
+                self.next_id += 1
+            self.tracks[ids[i]] = [np.asarray(box), 0]
+
+        seen = set(ids)
+        for tid in track_ids:
+            if tid in seen:
+                continue
+            self.tracks[tid][1] += 1
+            if self.tracks[tid][1] > self.max_missing:
+                del self.tracks[tid]
+                self.retired.append(tid)
+
+        return ids
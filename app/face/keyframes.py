@@ -0,0 +1,149 @@
+import cv2
+import numpy as np
+
+from face.facial_features import FEATURE_LANDMARKS
+from face.roi import Landmark
+
+# ================= CONFIG =================
+
+KEYFRAME_INTERVAL = 5        # run the landmarker at least every N frames (N - 1 propagated in between)
+MOTION_THRESHOLD = 3.0       # median point motion (px/frame) that forces a keyframe
+FB_ERROR_THRESHOLD = 1.5     # forward-backward LK error (px) tolerated per point
+SHAPE_TOLERANCE = 0.15       # allowed relative change of point spread vs keyframe
+
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+# =========================================
+
+
+class PropagatedLandmarks:
+    """
+    Landmarks of the last keyframe with the tracked indices replaced by
+    their optical-flow positions. Untracked indices keep keyframe values.
+    """
+
+    def __init__(self, base, tracked):
+        self.base = base
+        self.tracked = tracked      # landmark index -> Landmark
+
+    def __len__(self):
+        return len(self.base)
+
+    def __getitem__(self, i):
+        lm = self.tracked.get(i)
+        return lm if lm is not None else self.base[i]
+
+    def __iter__(self):
+        for i in range(len(self.base)):
+            yield self[i]
+
+
+class LandmarkPropagator:
+    """
+    Propagates the feature landmarks between keyframes with sparse
+    pyramidal Lucas-Kanade optical flow.
+
+    propagate() returns None whenever a new keyframe is needed: the
+    keyframe was `interval` frames ago (so the landmarker runs at least
+    every `interval` frames), the face moved too much, or the tracked points
+    drifted (LK failure, forward-backward error, or shape change).
+    """
+
+    def __init__(
+        self,
+        interval=KEYFRAME_INTERVAL,
+        motion_threshold=MOTION_THRESHOLD,
+        fb_error_threshold=FB_ERROR_THRESHOLD,
+        shape_tolerance=SHAPE_TOLERANCE,
+        indices=FEATURE_LANDMARKS
+    ):
+        self.interval = interval
+        self.motion_threshold = motion_threshold
+        self.fb_error_threshold = fb_error_threshold
+        self.shape_tolerance = shape_tolerance
+        self.indices = tuple(indices)
+
+        self.prev_gray = None
+        self.points = None          # float32 [K, 1, 2] in pixels
+        self.base = None
+        self.key_spread = 0.0
+        self.frames_since_key = 0
+
+        self.keyframes = 0
+        self.propagated = 0
+        self.drift_resets = 0
+        self.motion_resets = 0
+
+    def reset(self, gray, landmarks, img_w, img_h):
+        """Start tracking from a fresh keyframe (landmarks may be None)."""
+        self.keyframes += 1
+        self.frames_since_key = 0
+
+        if landmarks is None:
+            self.prev_gray = None
+            self.points = None
+            self.base = None
+            return
+
+        self.points = np.array(
+            [[[landmarks[i].x * img_w, landmarks[i].y * img_h]] for i in self.indices],
+            dtype=np.float32
+        )
+        self.prev_gray = gray
+        self.base = landmarks
+        self.key_spread = self._spread(self.points)
+
+    @staticmethod
+    def _spread(points):
+        return float(np.linalg.norm(points.std(axis=0)))
+
+    def propagate(self, gray, img_w, img_h):
+        if self.points is None or self.frames_since_key >= self.interval - 1:
+            return None
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.prev_gray, gray, self.points, None, **LK_PARAMS
+        )
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(
+            gray, self.prev_gray, new_points, None, **LK_PARAMS
+        )
+
+        # ---- Drift checks ----
+        fb_error = np.linalg.norm((back_points - self.points).reshape(-1, 2), axis=1)
+        if (
+            not status.all()
+            or not back_status.all()
+            or fb_error.max() > self.fb_error_threshold
+        ):
+            self.drift_resets += 1
+            return None
+
+        if self.key_spread > 1e-6:
+            change = abs(self._spread(new_points) - self.key_spread) / self.key_spread
+            if change > self.shape_tolerance:
+                self.drift_resets += 1
+                return None
+
+        motion = np.linalg.norm((new_points - self.points).reshape(-1, 2), axis=1)
+        if float(np.median(motion)) > self.motion_threshold:
+            self.motion_resets += 1
+            return None
+
+        self.prev_gray = gray
+        self.points = new_points
+        self.frames_since_key += 1
+        self.propagated += 1
+
+        tracked = {
+            idx: Landmark(
+                float(p[0, 0]) / img_w,
+                float(p[0, 1]) / img_h,
+                self.base[idx].z
+            )
+            for idx, p in zip(self.indices, new_points)
+        }
+        return PropagatedLandmarks(self.base, tracked)
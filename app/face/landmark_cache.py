@@ -0,0 +1,255 @@
+"""
+Per-session landmark cache.
+
+The main loop appends every frame's landmarks (float16, [faces, 478, 3]),
+face ids / validity mask, capture timestamp and playback position to an
+append-only memory-mapped file. Feature or scoring experiments then read
+the landmarks back zero-copy and re-run the AU extraction in
+milliseconds, instead of decoding a recording and running MediaPipe again.
+
+Layout of <dir>/: landmarks.bin (fixed-size records, see frame_dtype())
+and meta.json (record count, frame size, video ids, ...).
+
+Run from the app/ directory:
+    python -m face.landmark_cache landmarks/default_eid12
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.signal import lfilter
+
+LANDMARK_COUNT = 478
+GROW_FRAMES = 9000          # file grows in steps of 5 min at 30 fps
+DATA_FILE = "landmarks.bin"
+META_FILE = "meta.json"
+REPLAY_CHUNK = 16384        # face entries gathered per step (~0.4 MB of landmarks)
+
+
+def frame_dtype(max_faces):
+    """One record per frame (little-endian, ~2.9 KB per face)."""
+    return np.dtype([
+        ("t", "<f8"),                   # capture time (FaceTracker.frame_timestamp_ms)
+        ("play_time", "<f4"),           # playback position in the clip (NaN = not playing)
+        ("video", "<i2"),               # index into meta["videos"] (-1 = none)
+        ("valid", "u1", (max_faces,)),  # 1 where a face was found
+        ("face_id", "<i2", (max_faces,)),
+        ("points", "<f2", (max_faces, LANDMARK_COUNT, 3)),
+    ])
+
+
+class LandmarkCacheWriter:
+    """
+    Appends per-frame landmarks to <directory>/landmarks.bin.
+
+    The file is extended GROW_FRAMES records at a time and memory-mapped,
+    so an append is a copy into the page cache. close() trims the unused
+    tail and writes meta.json; a cache without meta.json is incomplete.
+    """
+
+    def __init__(self, directory, max_faces=1, frame_size=None, mirrored=False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_faces = max_faces
+        self.frame_size = frame_size
+        self.mirrored = mirrored
+        self.dtype = frame_dtype(max_faces)
+
+        self.count = 0
+        self.capacity = 0
+        self.rows = None
+        self.videos = []
+        self._video_index = {}
+        self._file = open(self.directory / DATA_FILE, "w+b")
+
+    def _grow(self):
+        if self.rows is not None:
+            # Windows cannot resize a file while it is mapped: release the
+            # old map (the only reference to it) before truncating
+            self.rows.flush()
+            self.rows = None
+        self.capacity += GROW_FRAMES
+        self._file.truncate(self.capacity * self.dtype.itemsize)
+        self.rows = np.memmap(self._file, dtype=self.dtype, mode="r+", shape=(self.capacity,))
+
+    def append(self, t, points=None, face_ids=None, video_id=None, play_time=None, frame_size=None):
+        """
+        points: [F, 478, 3] normalized landmarks (None = no face),
+        face_ids: F ids (default 0..F-1). Faces beyond max_faces are dropped.
+        """
+        if self.count == self.capacity:
+            self._grow()
+        if frame_size is not None:
+            self.frame_size = frame_size
+
+        video = -1
+        if video_id is not None:
+            video = self._video_index.get(video_id)
+            if video is None:
+                video = self._video_index[video_id] = len(self.videos)
+                self.videos.append(video_id)
+
+        i = self.count
+        rows = self.rows
+        rows["t"][i] = t
+        rows["play_time"][i] = np.nan if play_time is None else play_time
+        rows["video"][i] = video
+
+        n = 0 if points is None else min(len(points), self.max_faces)
+        rows["valid"][i] = 0
+        rows["face_id"][i] = -1
+        if n:
+            rows["points"][i, :n] = points[:n]
+            rows["valid"][i, :n] = 1
+            rows["face_id"][i, :n] = face_ids[:n] if face_ids is not None else np.arange(n)
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.rows is not None:
+            self.rows.flush()
+            self.rows = None
+        self._file.truncate(self.count * self.dtype.itemsize)
+        self._file.close()
+
+        meta = {
+            "frames": self.count,
+            "max_faces": self.max_faces,
+            "landmarks": LANDMARK_COUNT,
+            "frame_size": self.frame_size,
+            "mirrored": self.mirrored,
+            "videos": self.videos,
+        }
+        tmp = self.directory / (META_FILE + ".tmp")
+        tmp.write_text(json.dumps(meta, indent=2))
+        tmp.replace(self.directory / META_FILE)
+
+
+class LandmarkCache:
+    """
+    Read-only, zero-copy view of a closed cache.
+
+    Field arrays (t, play_time, video, valid, face_id, points) are views
+    into the memory map; points are float16 and should be cast per chunk.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.meta = json.loads((self.directory / META_FILE).read_text())
+        self.videos = self.meta["videos"]
+        self.frame_size = tuple(self.meta["frame_size"]) if self.meta["frame_size"] else None
+        dtype = frame_dtype(self.meta["max_faces"])
+        if self.meta["frames"]:
+            self.rows = np.memmap(self.directory / DATA_FILE, dtype=dtype, mode="r", shape=(self.meta["frames"],))
+        else:
+            self.rows = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getattr__(self, name):
+        rows = self.__dict__.get("rows")
+        if rows is not None and name in rows.dtype.names:
+            return rows[name]
+        raise AttributeError(name)
+
+    def video_mask(self, video_id):
+        """Boolean mask of the frames recorded while video_id was current."""
+        if video_id not in self.videos:
+            return np.zeros(len(self), dtype=bool)
+        return self.rows["video"] == self.videos.index(video_id)
+
+
+def _calibrated_baseline(values, ids, baseline_frames):
+    """
+    Per-entry baseline of GroupFeatureExtractor for a whole session:
+    for every face id, the EMA (0.9 / 0.1) of its first baseline_frames
+    values, frozen afterwards. values and ids are in frame order.
+    """
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    group = np.cumsum(np.r_[False, sorted_ids[1:] != sorted_ids[:-1]])
+    rank = np.arange(len(ids)) - starts[group]
+
+    # [ids, baseline_frames] calibration values, filtered along the rows;
+    # the EMA starts at the first value (zi = 0.9 * x0 gives y0 = x0)
+    calib = np.zeros((len(starts), baseline_frames))
+    first = rank < baseline_frames
+    calib[group[first], rank[first]] = values[order][first]
+    filtered, _ = lfilter([0.1], [1.0, -0.9], calib, axis=1, zi=0.9 * calib[:, :1])
+
+    base = np.empty(len(ids))
+    base[order] = filtered[group, np.minimum(rank, baseline_frames - 1)]
+    return base
+
+
+def replay_features(cache, baseline_frames=60, chunk_frames=REPLAY_CHUNK):
+    """
+    Re-runs AU extraction over the cached landmarks.
+
+    Returns (au25, au12, au6) arrays of shape [frames, max_faces] (NaN
+    where there was no face), equal to feeding every frame through a
+    fresh GroupFeatureExtractor. Distances are computed for all faces of
+    chunk_frames entries at a time, and the per-face-id baselines are
+    one filter pass, so no Python code runs per frame.
+    """
+    from face.facial_features import GROUP_LANDMARKS, _ratio, pair_distances
+
+    w, h = cache.frame_size
+    out = np.full((3, len(cache), cache.meta["max_faces"]), np.nan, dtype=np.float32)
+    frames, faces = np.nonzero(cache.valid)
+    if not len(frames):
+        return out[0], out[1], out[2]
+
+    # Only the landmarks the features read are gathered from the map
+    landmarks = np.array(GROUP_LANDMARKS)
+    dist = np.empty((len(frames), 6), dtype=np.float32)
+    for i in range(0, len(frames), chunk_frames):
+        f, k = frames[i:i + chunk_frames, None], faces[i:i + chunk_frames, None]
+        dist[i:i + chunk_frames] = pair_distances(cache.points[f, k, landmarks].astype(np.float32), w, h)
+
+    mouth_open, mouth_width = dist[:, 0], dist[:, 1]
+    eye_opening = (_ratio(dist[:, 2], dist[:, 3]) + _ratio(dist[:, 4], dist[:, 5])) / 2.0
+
+    ids = cache.face_id[frames, faces]
+    base_mouth = _calibrated_baseline(mouth_width, ids, baseline_frames)
+    base_eye = _calibrated_baseline(eye_opening, ids, baseline_frames)
+
+    ok_mouth = base_mouth > 1e-6
+    ok_eye = base_eye > 1e-6
+    out[0, frames, faces] = _ratio(mouth_open, mouth_width)
+    out[1, frames, faces] = np.where(
+        ok_mouth, np.maximum(0.0, (mouth_width - base_mouth) / np.where(ok_mouth, base_mouth, 1.0)), 0.0
+    )
+    out[2, frames, faces] = np.where(
+        ok_eye, np.maximum(0.0, (base_eye - eye_opening) / np.where(ok_eye, base_eye, 1.0)), 0.0
+    )
+    return out[0], out[1], out[2]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a landmark cache and replay AU extraction")
+    parser.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    cache = LandmarkCache(args.directory)
+    n = len(cache)
+    with_face = int(cache.valid.any(axis=1).sum()) if n else 0
+    print(f"{args.directory}: {n} frames, {with_face} with a face, "
+          f"{len(cache.videos)} videos, frame size {cache.frame_size}")
+    if not with_face or cache.frame_size is None:
+        return
+
+    t0 = time.perf_counter()
+    au25, au12, au6 = replay_features(cache)
+    elapsed = time.perf_counter() - t0
+    print(f"Replayed AUs in {elapsed * 1000:.0f} ms "
+          f"(mean au25 {np.nanmean(au25):.3f}, au12 {np.nanmean(au12):.3f}, au6 {np.nanmean(au6):.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Padding added around the landmark bounding box, as a fraction of its size
+ROI_PADDING = 0.35
+
+# Side length (px) the face crop is resized to before landmark detection
+ROI_INPUT_SIZE = 256
+
+# Below this side length (px) the crop is not trusted and we search the full frame
+MIN_ROI_SIZE = 48
+
+Landmark = namedtuple("Landmark", ["x", "y", "z"])
+
+
+def landmark_points(landmarks, indices=None):
+    """
+    float32 array [N, 3] of the given landmark indices (all by default).
+    Wrapped sequences (ROI, mirrored) convert their raw points in one
+    vectorized step instead of building a Landmark per point.
+    """
+    to_array = getattr(landmarks, "to_array", None)
+    if to_array is not None:
+        return to_array(indices)
+    if indices is None:
+        points = [(lm.x, lm.y, lm.z) for lm in landmarks]
+    else:
+        points = [(landmarks[i].x, landmarks[i].y, landmarks[i].z) for i in indices]
+    return np.array(points, dtype=np.float32).reshape(-1, 3)
+
+
+def landmark_bbox(landmarks):
+    """Normalized bounding box (xmin, ymin, xmax, ymax) of the landmarks."""
+    if isinstance(landmarks, RoiLandmarks):
+        return landmarks.bbox()
+
+    xs = [lm.x for lm in landmarks]
+    ys = [lm.y for lm in landmarks]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def face_roi(landmarks, img_w, img_h, padding=ROI_PADDING):
+    """
+    Square, padded pixel ROI (x0, y0, x1, y1) around the landmarks.
+    The square is shifted (not shrunk) to stay inside the frame.
+    Returns None if no usable ROI exists.
+    """
+    xmin, ymin, xmax, ymax = landmark_bbox(landmarks)
+
+    cx = (xmin + xmax) / 2.0 * img_w
+    cy = (ymin + ymax) / 2.0 * img_h
+    side = max(
+        (xmax - xmin) * img_w,
+        (ymax - ymin) * img_h
+    ) * (1.0 + 2.0 * padding)
+
+    side = int(side)
+    if side < MIN_ROI_SIZE or side > min(img_w, img_h):
+        return None
+
+    x0 = int(cx - side / 2.0)
+    y0 = int(cy - side / 2.0)
+    x0 = max(0, min(x0, img_w - side))
+    y0 = max(0, min(y0, img_h - side))
+
+    return x0, y0, x0 + side, y0 + side
+
+
+class RoiLandmarks:
+    """
+    Read-only landmark sequence that maps ROI-normalized coordinates
+    back to full-frame normalized coordinates on access.
+
+    FacialFeatureExtractor only touches a dozen indices, so mapping
+    lazily avoids converting all 478 points every frame.
+    """
+
+    def __init__(self, landmarks, roi, img_w, img_h):
+        self.landmarks = landmarks
+        x0, y0, x1, y1 = roi
+
+        self.x0 = x0 / img_w
+        self.y0 = y0 / img_h
+        self.sx = (x1 - x0) / img_w
+        self.sy = (y1 - y0) / img_h
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def __getitem__(self, i):
+        lm = self.landmarks[i]
+        return Landmark(
+            self.x0 + lm.x * self.sx,
+            self.y0 + lm.y * self.sy,
+            lm.z * self.sx
+        )
+
+    def to_array(self, indices=None):
+        points = landmark_points(self.landmarks, indices)
+        points[:, 0] = self.x0 + points[:, 0] * self.sx
+        points[:, 1] = self.y0 + points[:, 1] * self.sy
+        points[:, 2] *= self.sx
+        return points
+
+    def bbox(self):
+        xs = [lm.x for lm in self.landmarks]
+        ys = [lm.y for lm in self.landmarks]
+        return (
+            self.x0 + min(xs) * self.sx,
+            self.y0 + min(ys) * self.sy,
+            self.x0 + max(xs) * self.sx,
+            self.y0 + max(ys) * self.sy
+        )
+
+    def __iter__(self):
+        for i in range(len(self.landmarks)):
+            yield self[i]
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from web.server import DEFAULT_STATION, station_url
+
+REPORT_INTERVAL = 0.2   # the browser player reports every 200 ms
+
+
+class ScriptedPlayer:
+    """
+    Stands in for the participant's browser: submits the registration
+    form to /start, then walks the playlist posting /status updates the
+    same way templates/player.html does.
+
+    playlist: list of (video_id, duration_seconds), or a callable returning
+        one (resolved once the server is up, i.e. after main() built it)
+    speed: playback speed multiplier (2.0 = clips take half as long)
+    session_seconds: keep cycling the playlist until this much time has
+        passed (None = play it once)
+    """
+
+    def __init__(
+        self,
+        playlist,
+        base_url=None,
+        participant=None,
+        speed=1.0,
+        session_seconds=None
+    ):
+        self.playlist = playlist
+        # Default: the default station on SERVER_PORT
+        self.base_url = (base_url or station_url(DEFAULT_STATION)).rstrip("/")
+        self.participant = participant or {"name": "soak-test", "age": "30", "gender": "Other"}
+        self.speed = speed
+        self.session_seconds = session_seconds
+        self.thread = None
+        self.errors = 0
+        self.videos_played = 0
+
+    def _post(self, path, *, form=None, payload=None):
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        else:
+            data = json.dumps(payload).encode()
+            headers = {"Content-Type": "application/json"}
+
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                resp.read()
+        except OSError:
+            self.errors += 1
+
+    def _status(self, vid, playing, status, timestamp, switch=None):
+        payload = {
+            "video_id": vid,
+            "playing": playing,
+            "status": status,
+            "timestamp": timestamp,
+            "event_time": time.time()
+        }
+        if switch is not None:
+            payload["switch"] = switch
+        self._post("/status", payload=payload)
+
+    def wait_for_server(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(self.base_url + "/", timeout=2) as resp:
+                    resp.read()
+                return True
+            except OSError:
+                time.sleep(0.2)
+        return False
+
+    def run(self):
+        if not self.wait_for_server():
+            raise RuntimeError(f"Server at {self.base_url} did not come up")
+
+        if callable(self.playlist):
+            self.playlist = self.playlist()
+        self.playlist = list(self.playlist)
+
+        self._post("/start", form=self.participant)
+
+        if not self.playlist:
+            self._status("UNKNOWN", False, "playlist_ended", 0.0)
+            return
+
+        start = time.monotonic()
+        vid = None
+        position = 0.0
+        switch = None
+        while True:
+            for vid, duration in self.playlist:
+                clip_start = time.monotonic()
+                position = 0.0
+                if switch is not None:
+                    # Like the gapless player: the next clip starts right away
+                    switch.update(to=vid, started_at=time.time())
+                while position < duration:
+                    self._status(vid, True, "playing", position, switch=switch)
+                    switch = None
+                    time.sleep(REPORT_INTERVAL)
+                    position = (time.monotonic() - clip_start) * self.speed
+
+                self.videos_played += 1
+                if self.session_seconds is None or time.monotonic() - start < self.session_seconds:
+                    self._status(vid, False, "ended", float(duration))
+                    switch = {"from": vid, "ended_at": time.time()}
+                else:
+                    break
+
+            if self.session_seconds is None or time.monotonic() - start >= self.session_seconds:
+                break
+
+        self._status(vid, False, "playlist_ended", position)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="scripted-player", daemon=True)
+        self.thread.start()
+        return self.thread
@@ -0,0 +1,202 @@
+"""
+Headless end-to-end soak test.
+
+Runs main.main() with a fake camera, fake microphone and a scripted
+player instead of a webcam, sounddevice and a browser, then reports
+sustained FPS, latency percentiles and RSS growth.
+
+Run from the app/ directory:
+    python -m headless.soak --hours 3 --report soak.json
+    python -m headless.soak --minutes 5 --video clip.mp4 --wav laugh.wav
+    python -m headless.soak --minutes 5 --db app.db   # runs on a copy of app.db
+"""
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bench import fixtures
+from headless.player_client import ScriptedPlayer
+from headless.sources import FakeCamera, FakeMicrophone
+from utils.metrics import METRICS, peak_rss_mb
+
+RSS_SAMPLE_SECONDS = 10.0
+RSS_WARMUP_SECONDS = 60.0     # ignore allocator/model warm-up when fitting growth
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # Peak rather than current RSS, but better than nothing elsewhere
+    return peak_rss_mb()
+
+
+class RssSampler:
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.samples = []           # (seconds since start, MB)
+        self.stop_event = threading.Event()
+        self.start_time = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        mb = rss_mb()
+        if mb is not None:
+            self.samples.append((time.monotonic() - self.start_time, mb))
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            self._sample()
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=2.0)
+        self._sample()
+
+    def growth_mb_per_hour(self, warmup=RSS_WARMUP_SECONDS):
+        """Least-squares slope of RSS over time after the warm-up period."""
+        pts = [(t, m) for t, m in self.samples if t >= warmup] or self.samples
+        if len(pts) < 2:
+            return 0.0
+        n = len(pts)
+        mt = sum(t for t, _ in pts) / n
+        mm = sum(m for _, m in pts) / n
+        var = sum((t - mt) ** 2 for t, _ in pts)
+        if var == 0:
+            return 0.0
+        cov = sum((t - mt) * (m - mm) for t, m in pts)
+        return cov / var * 3600.0
+
+
+def playlist_with_durations():
+    """The playlist main() handed to the server, as (video id, duration) pairs."""
+    import web.server as server
+
+    return [(v["id"], v["duration"] or 30) for v in server.current_playlist]
+
+
+def use_database(path):
+    from sqlalchemy import create_engine
+    import web.server as server
+    from persistence.db import SessionLocal
+
+    SessionLocal.configure(bind=create_engine(f"sqlite:///{path}", future=True))
+    server.DB_PATH = str(path)
+
+
+def build_report(args, sampler, player, elapsed):
+    snap = METRICS.snapshot()
+    frames = snap["counters"].get("frames", 0)
+    return {
+        "duration_s": elapsed,
+        "frames": frames,
+        "sustained_fps": frames / snap["uptime_s"] if snap["uptime_s"] > 0 else 0.0,
+        "frame_latency_ms": {
+            k: snap["stages"].get("frame", {}).get(k, 0.0)
+            for k in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+        },
+        "stages": {
+            name: {k: h[k] for k in ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")}
+            for name, h in snap["stages"].items()
+        },
+        "counters": snap["counters"],
+        "gauges": snap["gauges"],
+        "rss_mb": {
+            "start": sampler.samples[0][1] if sampler.samples else 0.0,
+            "end": sampler.samples[-1][1] if sampler.samples else 0.0,
+            "peak": max((m for _, m in sampler.samples), default=0.0),
+            "growth_per_hour": sampler.growth_mb_per_hour(),
+        },
+        "player": {"videos_played": player.videos_played, "http_errors": player.errors},
+        "config": vars(args),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless soak test of the full pipeline")
+    parser.add_argument("--hours", type=float, default=0.0)
+    parser.add_argument("--minutes", type=float, default=0.0)
+    parser.add_argument("--video", help="video file for the fake camera (default: synthetic frames)")
+    parser.add_argument("--wav", help="WAV file for the fake microphone (default: synthetic laughter)")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--speed", type=float, default=1.0, help="scripted playback speed")
+    parser.add_argument("--db", help="database to start from; the run writes to a temporary copy "
+                                     "(default: generated DB)")
+    parser.add_argument("--in-place", action="store_true",
+                        help="write experiments, signals and stats into --db itself")
+    parser.add_argument("--videos", type=int, default=2000, help="videos in the generated DB")
+    parser.add_argument("--report", help="write the JSON report here")
+    args = parser.parse_args(argv)
+    if args.in_place and not args.db:
+        parser.error("--in-place needs --db")
+
+    session_seconds = args.hours * 3600.0 + args.minutes * 60.0 or 600.0
+
+    import main as app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if args.in_place:
+            db_path = Path(args.db)
+        elif args.db:
+            # The soak writes sessions into the database: keep the given one untouched
+            db_path = fixtures.copy_database(args.db, tmp / "soak.db")
+        else:
+            db_path = fixtures.build_database(tmp / "soak.db", n_videos=args.videos)
+        use_database(db_path)
+
+        if args.video:
+            camera = FakeCamera(path=args.video, fps=args.fps)
+        else:
+            camera = FakeCamera(frames=fixtures.synthetic_frames(90), fps=args.fps)
+
+        if args.wav:
+            microphone = FakeMicrophone(path=args.wav)
+        else:
+            microphone = FakeMicrophone(samples=fixtures.synthetic_audio(30.0, kind="laugh"))
+
+        player = ScriptedPlayer(
+            playlist_with_durations,
+            speed=args.speed,
+            session_seconds=session_seconds
+        )
+        sampler = RssSampler()
+
+        sampler.start()
+        player.start()
+        start = time.monotonic()
+        try:
+            app.main(
+                camera=camera,
+                microphone=microphone,
+                open_browser=None,
+                show_window=False,
+                log_path=str(tmp / "soak_log.txt")
+            )
+        finally:
+            sampler.stop()
+
+        report = build_report(args, sampler, player, time.monotonic() - start)
+
+    print(json.dumps({k: v for k, v in report.items() if k != "stages"}, indent=2))
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.report}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FakeCamera:
+    """
+    cv2.VideoCapture stand-in.
+
+    Plays a video file in a loop (path=...) or cycles through a list of
+    BGR frames (frames=...), paced to `fps` like a real webcam.
+    """
+
+    def __init__(self, path=None, frames=None, fps=30.0, realtime=True):
+        import cv2
+
+        if (path is None) == (frames is None):
+            raise ValueError("Pass exactly one of path or frames")
+
+        self.fps = fps
+        self.realtime = realtime
+        self.frames = frames
+        self.index = 0
+        self.video = cv2.VideoCapture(path) if path is not None else None
+        self.opened = frames is not None or self.video.isOpened()
+        self.next_due = time.monotonic()
+        self.props = {}
+
+    def isOpened(self):
+        return self.opened
+
+    def _next_frame(self):
+        if self.video is None:
+            frame = self.frames[self.index % len(self.frames)]
+            self.index += 1
+            return frame
+
+        import cv2
+
+        ok, frame = self.video.read()
+        if not ok:
+            # Loop the file
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.video.read()
+        return frame if ok else None
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+
+        if self.realtime:
+            now = time.monotonic()
+            if self.next_due > now:
+                time.sleep(self.next_due - now)
+            self.next_due = max(self.next_due, now) + 1.0 / self.fps
+
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame.copy()
+
+    def set(self, prop, value):
+        # Format negotiation is meaningless here; remember and report "not supported"
+        self.props[prop] = value
+        return False
+
+    def get(self, prop):
+        return self.props.get(prop, 0.0)
+
+    def release(self):
+        self.opened = False
+        if self.video is not None:
+            self.video.release()
+
+
+class FakeMicrophone:
+    """
+    sd.InputStream stand-in, used as `stream_factory` for YamnetAudio.
+
+    Delivers a WAV file (path=...) or a float32 array (samples=...) to the
+    callback in real-time sized blocks, looping forever.
+    """
+
+    def __init__(self, path=None, samples=None, sample_rate=16000, blocksize=1024):
+        if (path is None) == (samples is None):
+            raise ValueError("Pass exactly one of path or samples")
+
+        if path is not None:
+            import soundfile as sf
+
+            samples, file_rate = sf.read(path, dtype="float32", always_2d=True)
+            samples = samples[:, 0]
+            if file_rate != sample_rate:
+                from math import gcd
+                from scipy.signal import resample_poly
+
+                g = gcd(int(sample_rate), int(file_rate))
+                samples = resample_poly(samples, sample_rate // g, file_rate // g).astype(np.float32)
+
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+
+    def __call__(self, samplerate, channels, dtype, callback, **kwargs):
+        # Matches sd.InputStream(samplerate=..., channels=..., dtype=..., callback=...)
+        if samplerate != self.sample_rate:
+            raise ValueError(f"FakeMicrophone is {self.sample_rate} Hz, stream asked for {samplerate} Hz")
+        return _FakeStream(self.samples, samplerate, self.blocksize, callback)
+
+
+class _FakeStream:
+    def __init__(self, samples, sample_rate, blocksize, callback):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.running = False
+        self.thread = None
+
+    def _run(self):
+        pos = 0
+        n = len(self.samples)
+        block = np.empty((self.blocksize, 1), dtype=np.float32)
+        period = self.blocksize / self.sample_rate
+        next_due = time.monotonic()
+
+        while self.running:
+            end = pos + self.blocksize
+            if end <= n:
+                block[:, 0] = self.samples[pos:end]
+            else:
+                head = n - pos
+                block[:head, 0] = self.samples[pos:]
+                block[head:, 0] = self.samples[:self.blocksize - head]
+            pos = end % n
+
+            self.callback(block, self.blocksize, None, None)
+
+            next_due += period
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="fake-microphone", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -1,48 +1,232 @@
+"""
+Database inspector.
+
+Prints a health overview computed in SQL (row counts, video status and
+category breakdowns, duration histogram, score distributions) without
+loading tables into memory. Rows are only printed on request, streamed
+page by page.
+
+Usage (from the app/ directory):
+    python inspect_db.py                              # overview
+    python inspect_db.py --exact-counts               # overview, COUNT(*) even on large tables
+    python inspect_db.py --table Video --limit 20     # first rows
+    python inspect_db.py --table Video --where "status = 'n/a'" --limit 50
+    python inspect_db.py --table ExperimentVideo --sample 10
+    python inspect_db.py --table Video --limit 0      # every row (streamed)
+"""
+import argparse
 import sqlite3
+import sys
+import time
 
 DB_PATH = "app.db"
 
-conn = sqlite3.connect(DB_PATH)
-cur = conn.cursor()
+PAGE_SIZE = 500
+DURATION_BUCKET = 10        # seconds per duration histogram bar
+SCORE_BUCKET = 0.1          # score units per score histogram bar
+BAR_WIDTH = 40
+EXACT_COUNT_LIMIT = 200_000  # larger tables show an estimate unless --exact-counts
+
+
+def connect(path):
+    # Read-only: inspecting must never lock out a running session
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
 
-print("\nInspecting database:", DB_PATH)
-print("-" * 60)
+def tables(conn):
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
 
-# List all tables
-tables = cur.execute(
-    "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;"
-).fetchall()
 
-if not tables:
-    print("No tables found.")
-else:
-    print("Tables found:")
-    for t in tables:
-        print(" -", t[0])
+def columns(conn, table):
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
 
-# Inspect each table
-for (table_name,) in tables:
+
+def row_count(conn, table, exact=False):
+    """
+    (rows, exact). COUNT(*) scans the whole table, so tables past
+    EXACT_COUNT_LIMIT (e.g. SignalSample) are estimated from sqlite_stat1
+    (after ANALYZE) or MAX(rowid), which is an upper bound after deletes.
+    """
+    if not exact:
+        try:
+            upper = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            upper = None  # WITHOUT ROWID table
+        if upper is not None and upper > EXACT_COUNT_LIMIT:
+            stat = None
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+                stat = conn.execute(
+                    "SELECT stat FROM sqlite_stat1 WHERE tbl = ? ORDER BY idx IS NOT NULL LIMIT 1", (table,)
+                ).fetchone()
+            return (int(stat[0].split()[0]) if stat else upper), False
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0], True
+
+
+def print_histogram(title, rows):
+    """rows: (label, count) pairs"""
+    rows = list(rows)
+    print(f"\n{title}")
+    if not rows:
+        print("  (no data)")
+        return
+    peak = max(n for _, n in rows) or 1
+    for label, n in rows:
+        bar = "#" * max(1, round(BAR_WIDTH * n / peak)) if n else ""
+        print(f"  {label:>14}  {n:>9}  {bar}")
+
+
+# ---------- Overview ----------
+def overview(conn, exact_counts=False):
+    names = tables(conn)
+    print(f"\nInspecting database: {DB_PATH}")
+    print("-" * 60)
+    if not names:
+        print("No tables found.")
+        return
+
+    print(f"{'table':<24}{'rows':>12}  columns")
+    for name in names:
+        n, exact = row_count(conn, name, exact_counts)
+        rows = f"{n}" if exact else f"~{n}"
+        print(f"{name:<24}{rows:>12}  {', '.join(columns(conn, name))}")
+
+    if "Video" in names:
+        video_summary(conn, names)
+    if "ExperimentVideo" in names:
+        score_summary(conn, "ExperimentVideo", "score", "Per-video scores (ExperimentVideo.score)")
+    if "Experiment" in names:
+        score_summary(conn, "Experiment", "total_score", "Session scores (Experiment.total_score)")
+
+
+def video_summary(conn, names):
     print("\n" + "=" * 60)
-    print("TABLE:", table_name)
+    print("VIDEOS")
     print("=" * 60)
 
-    # Show columns
-    cols = cur.execute(f"PRAGMA table_info({table_name});").fetchall()
-    col_names = [c[1] for c in cols]
+    print_histogram("By status:", conn.execute(
+        "SELECT status, COUNT(*) FROM Video GROUP BY status ORDER BY COUNT(*) DESC"
+    ))
 
-    print("Columns:")
-    for c in col_names:
-        print(" -", c)
+    has_category_id = "category_id" in columns(conn, "Video")
+    if has_category_id and "Category" in names:
+        print_histogram("By category:", conn.execute(
+            "SELECT c.name, COUNT(v.vid) FROM Category c "
+            "LEFT JOIN Video v ON v.category_id = c.cid "
+            "GROUP BY c.cid ORDER BY COUNT(v.vid) DESC"
+        ))
+    elif has_category_id:
+        print_histogram("By category_id:", conn.execute(
+            "SELECT category_id, COUNT(*) FROM Video GROUP BY category_id ORDER BY COUNT(*) DESC"
+        ))
 
-    # Show rows
-    rows = cur.execute(f"SELECT * FROM {table_name};").fetchall()
+    row = conn.execute("SELECT MIN(duration), AVG(duration), MAX(duration) FROM Video").fetchone()
+    if row[0] is not None:
+        print(f"\nDuration: min {row[0]}s, mean {row[1]:.1f}s, max {row[2]}s")
+        print_histogram(f"Duration histogram ({DURATION_BUCKET}s buckets):", (
+            (f"{b * DURATION_BUCKET}-{(b + 1) * DURATION_BUCKET}s", n)
+            for b, n in conn.execute(
+                "SELECT CAST(duration / ? AS INTEGER) AS b, COUNT(*) FROM Video "
+                "WHERE duration IS NOT NULL GROUP BY b ORDER BY b",
+                (DURATION_BUCKET,)
+            )
+        ))
 
-    if not rows:
-        print("\n(no rows)")
-    else:
-        print("\nRows:")
-        for r in rows:
-            print(r)
-
-print("\nInspection complete.")
-conn.close()
\ No newline at end of file
+
+def score_summary(conn, table, column, title):
+    print("\n" + "=" * 60)
+    print(title.upper())
+    print("=" * 60)
+
+    row = conn.execute(
+        f'SELECT COUNT("{column}"), AVG("{column}"), MIN("{column}"), MAX("{column}"), '
+        f'AVG("{column}" * "{column}") FROM "{table}"'
+    ).fetchone()
+    n, mean, lo, hi, mean_sq = row
+    if not n:
+        print("(no scores)")
+        return
+    sd = max(mean_sq - mean * mean, 0.0) ** 0.5
+    print(f"count {n}, mean {mean:.4f}, sd {sd:.4f}, min {lo:.4f}, max {hi:.4f}")
+
+    # Scores are non-negative, so CAST truncation equals floor() (which needs
+    # an SQLite built with math functions)
+    print_histogram(f"Histogram ({SCORE_BUCKET} buckets):", (
+        (f"{b * SCORE_BUCKET:.1f}-{(b + 1) * SCORE_BUCKET:.1f}", n)
+        for b, n in conn.execute(
+            f'SELECT CAST("{column}" / ? AS INTEGER) AS b, COUNT(*) FROM "{table}" '
+            f'WHERE "{column}" IS NOT NULL GROUP BY b ORDER BY b',
+            (SCORE_BUCKET,)
+        )
+    ))
+
+
+# ---------- Rows ----------
+def print_rows(conn, table, where=None, limit=20, sample=None, page_size=PAGE_SIZE):
+    if table not in tables(conn):
+        raise SystemExit(f"No such table: {table}")
+
+    sql = f'SELECT * FROM "{table}"'
+    if where:
+        sql += f" WHERE {where}"
+    if sample:
+        # The sorter keeps only `sample` rows: constant memory
+        sql += f" ORDER BY random() LIMIT {int(sample)}"
+    elif limit:
+        sql += f" LIMIT {int(limit)}"
+
+    print(f"\n{sql}")
+    print("-" * 60)
+    cur = conn.execute(sql)
+    print(" | ".join(d[0] for d in cur.description))
+
+    shown = 0
+    while True:
+        page = cur.fetchmany(page_size)
+        if not page:
+            break
+        for r in page:
+            print(" | ".join("NULL" if v is None else str(v) for v in r))
+        shown += len(page)
+    print(f"({shown} rows)")
+
+
+def main(argv=None):
+    global DB_PATH
+
+    parser = argparse.ArgumentParser(description="Inspect the experiment database")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--table", help="print rows of this table instead of the overview")
+    parser.add_argument("--where", help="SQL filter for --table, e.g. \"status = 'approved'\"")
+    parser.add_argument("--limit", type=int, default=20, help="rows to print (0 = all, streamed)")
+    parser.add_argument("--sample", type=int, help="print N random rows instead")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--exact-counts", action="store_true",
+                        help=f"COUNT(*) every table (tables over {EXACT_COUNT_LIMIT} rows are estimated otherwise)")
+    args = parser.parse_args(argv)
+
+    DB_PATH = args.db
+    t0 = time.perf_counter()
+    conn = connect(args.db)
+    try:
+        if args.table:
+            print_rows(conn, args.table, args.where, args.limit, args.sample, args.page_size)
+        else:
+            if args.where or args.sample:
+                parser.error("--where and --sample need --table")
+            overview(conn, args.exact_counts)
+    except sqlite3.Error as e:
+        print(f"SQL error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print(f"\nInspection complete ({time.perf_counter() - t0:.2f}s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
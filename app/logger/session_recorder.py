@@ -0,0 +1,185 @@
+import csv
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from utils.metrics import METRICS
+
+FRAME_QUEUE_SIZE = 64        # ~2 s of 30 fps video
+AUDIO_QUEUE_SIZE = 256       # ~16 s of 1024-sample blocks
+VIDEO_FOURCC = "MJPG"        # intra-only and cheap to encode; quality is adjustable
+
+# Load shedding: (queue fill at or above which the level applies, keep 1 of N frames, JPEG quality)
+SHED_LEVELS = (
+    (0.0, 1, 90),
+    (0.25, 2, 75),
+    (0.5, 4, 60),
+)
+
+
+class SessionRecorder:
+    """
+    Records a session's raw camera frames and microphone audio for
+    offline reprocessing.
+
+    The capture side only copies into bounded queues; encoder threads
+    write video with cv2.VideoWriter and audio with soundfile (FLAC).
+    When the video encoder falls behind, frames are decimated and the
+    JPEG quality is lowered instead of blocking capture; a full queue
+    drops the frame. Every written frame and audio block gets a row in
+    frames.csv / audio_blocks.csv with its time.monotonic() capture
+    time (frame: when the camera returned it; audio block: its first
+    sample), so both streams can be aligned with each other and with
+    the per-frame signals later.
+
+    Output (in out_dir): video.avi, frames.csv, audio.flac,
+    audio_blocks.csv, recording.json
+    """
+
+    def __init__(self, out_dir, fps=30.0, sample_rate=16000, flipped=False):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.fps = fps
+        self.sample_rate = sample_rate
+        self.flipped = flipped
+
+        self.frames = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+        self.audio = queue.Queue(maxsize=AUDIO_QUEUE_SIZE)
+
+        self.offered = 0
+        self.shed = 0                # skipped by decimation
+        self.dropped = 0             # queue full
+        self.audio_dropped = 0
+        self.written = 0
+        self.audio_samples = 0
+        self.size = None
+        self.level = 0
+
+        self._video_thread = threading.Thread(target=self._video_loop, name="recorder-video", daemon=True)
+        self._audio_thread = threading.Thread(target=self._audio_loop, name="recorder-audio", daemon=True)
+        self.started_at = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._video_thread.start()
+        self._audio_thread.start()
+        return self
+
+    # ---------- Capture side (must never block) ----------
+    def add_frame(self, frame, video_id=None, play_time=None, t=None):
+        """
+        Queue a BGR frame; it is copied, so reused capture buffers are fine.
+        t: monotonic capture time (e.g. FaceTracker.capture_time); default now.
+        """
+        self.offered += 1
+        fill = self.frames.qsize() / self.frames.maxsize
+        level = 0
+        for i, (threshold, _, _) in enumerate(SHED_LEVELS):
+            if fill >= threshold:
+                level = i
+        self.level = level
+
+        keep_every = SHED_LEVELS[level][1]
+        if self.offered % keep_every:
+            self.shed += 1
+            return
+
+        try:
+            self.frames.put_nowait((frame.copy(), t if t is not None else time.monotonic(), video_id, play_time, level))
+        except queue.Full:
+            self.dropped += 1
+            METRICS.inc("recorder_dropped_frames")
+
+    def add_audio(self, block, t=None):
+        """
+        Queue an audio block (frames x channels float32), e.g. from a stream
+        callback. t: monotonic capture time of its first sample; default now.
+        """
+        try:
+            self.audio.put_nowait((np.array(block[:, 0], dtype=np.float32), t if t is not None else time.monotonic()))
+        except queue.Full:
+            self.audio_dropped += 1
+            METRICS.inc("recorder_dropped_audio")
+
+    # ---------- Encoders ----------
+    def _video_loop(self):
+        writer = None
+        quality = None
+        with open(self.out_dir / "frames.csv", "w", newline="") as f:
+            rows = csv.writer(f)
+            rows.writerow(["frame", "monotonic", "video_id", "play_time", "shed_level"])
+            while True:
+                item = self.frames.get()
+                if item is None:
+                    break
+                frame, t, video_id, play_time, level = item
+
+                if writer is None:
+                    h, w = frame.shape[:2]
+                    self.size = (w, h)
+                    writer = cv2.VideoWriter(
+                        str(self.out_dir / "video.avi"),
+                        cv2.VideoWriter_fourcc(*VIDEO_FOURCC),
+                        self.fps,
+                        self.size
+                    )
+
+                if SHED_LEVELS[level][2] != quality:
+                    quality = SHED_LEVELS[level][2]
+                    writer.set(cv2.VIDEOWRITER_PROP_QUALITY, quality)
+
+                t0 = METRICS.start()
+                writer.write(frame)
+                METRICS.observe("recorder_encode", t0)
+                rows.writerow([self.written, f"{t:.6f}", video_id or "", "" if play_time is None else f"{play_time:.3f}", level])
+                self.written += 1
+
+        if writer is not None:
+            writer.release()
+
+    def _audio_loop(self):
+        import soundfile as sf
+
+        with sf.SoundFile(
+            str(self.out_dir / "audio.flac"), "w",
+            samplerate=self.sample_rate, channels=1, format="FLAC", subtype="PCM_16"
+        ) as out, open(self.out_dir / "audio_blocks.csv", "w", newline="") as f:
+            rows = csv.writer(f)
+            rows.writerow(["first_sample", "samples", "monotonic"])
+            while True:
+                item = self.audio.get()
+                if item is None:
+                    break
+                block, t = item
+                out.write(np.clip(block, -1.0, 1.0))
+                rows.writerow([self.audio_samples, len(block), f"{t:.6f}"])
+                self.audio_samples += len(block)
+
+    # ---------- Shutdown ----------
+    def close(self):
+        """Flushes both queues, closes the files and writes recording.json."""
+        for q, thread in ((self.frames, self._video_thread), (self.audio, self._audio_thread)):
+            if thread.is_alive():
+                q.put(None)
+                thread.join()
+
+        summary = {
+            "started_at": self.started_at,
+            "fps": self.fps,
+            "size": self.size,
+            "flipped": self.flipped,
+            "frames_offered": self.offered,
+            "frames_written": self.written,
+            "frames_shed": self.shed,
+            "frames_dropped": self.dropped,
+            "sample_rate": self.sample_rate,
+            "audio_samples": self.audio_samples,
+            "audio_blocks_dropped": self.audio_dropped,
+        }
+        (self.out_dir / "recording.json").write_text(json.dumps(summary, indent=2))
+        return summary
@@ -45,4 +45,12 @@ class TextLogger:
         )
 
         with open(self.file_path, "a") as f:
-            f.write(line)
\ No newline at end of file
+            f.write(line)
+
+    def write_metrics(self, lines):
+        """Appends a performance summary as comment lines at the end of the log."""
+        with open(self.file_path, "a") as f:
+            f.write("-" * 30 + "\n")
+            f.write("# Performance metrics\n")
+            for line in lines:
+                f.write(f"# {line}\n")
@@ -1,45 +1,161 @@
 import time
 import cv2
 import webbrowser
-import audio.yamnet_audio as yamnet_audio
-
 
 from persistence.repo import (
     get_or_create_subject,
     create_experiment,
     save_video_score,
     finalize_experiment,
-    video_exists
+    load_subject_baseline,
+    save_subject_baseline,
+    video_exists,
+    save_face_scores,
+    save_laugh_events
 )
+from persistence.db import init_db
+from persistence.writer import PendingWrites, submit_write
+from persistence.signals import SignalBuffer
 
 from audio.yamnet_audio import YamnetAudio
-from face.facial_features import FacialFeatureExtractor
+from face.facial_features import (
+    GROUP_LANDMARKS, BaselineStats, FacialFeatureExtractor, GroupFeatureExtractor, landmarks_to_array
+)
+from face.identity import FaceIdentityTracker, boxes_from_points
 from utils.smoothing import EMASmoother
 from scoring.scorer import AmusementScorer
+from scoring.aggregates import ScoreAggregate
+from scoring.episodes import LaughEpisodeDetector
 from face.face_tracker import FaceTracker
+from face.landmark_cache import LandmarkCacheWriter
+from face.capture import negotiate_capture
 from ui.overlay import ScoreOverlay
 from ui.au_debug_overlay import AUDebugOverlay
 from logger.text_logger import TextLogger
+from logger.session_recorder import SessionRecorder
+from utils.metrics import METRICS, RateMeter
 
 from playlist.manager import get_random_playlist
-from web.server import start_background_server, set_playlist
+from playlist.sampler import get_scored_playlist, observe_score
+from web.server import (
+    DEFAULT_STATION,
+    playback_position,
+    register_station,
+    set_playlist,
+    start_background_server,
+    station_url
+)
 
 BASELINE_FRAMES = 60
+
+# Reuse a returning subject's baseline (checked for drift) instead of recalibrating
+USE_BASELINE_CACHE = True
 SMOOTHING_ALPHA = 0.3
 
+# "single" or "group" (group tracks up to MAX_GROUP_FACES viewers)
+EXPERIMENT_TYPE = "single"
+MAX_GROUP_FACES = 4
+
+# "random" (uniform), or "ucb" / "thompson" to favour clips that got reactions
+PLAYLIST_POLICY = "random"
+
+CAMERA_INDEX = 0
+CAMERA_TARGET_FPS = 30
+
+# Run MediaPipe asynchronously (detect_async) instead of blocking per frame
+FACE_LIVE_STREAM = False
+
+# Run landmarks on a small crop around the previous face instead of the full frame
+FACE_ROI_TRACKING = True
+
+# Run the landmarker every N frames and track with optical flow in between (0 = off)
+FACE_KEYFRAME_INTERVAL = 0
+
+# Skip the per-frame pixel flip: mirror landmark coordinates instead and
+# flip only the image that is shown in the debug window
+FACE_MIRROR_LANDMARKS = True
+FACE_NATIVE_FORMAT = True
+
+# TFLite backend for YAMNet: None = first of ai_edge_litert / tflite_runtime /
+# tensorflow that is installed, "fastest" = benchmark them at startup
+AUDIO_BACKEND = None
+AUDIO_NUM_THREADS = 1
+
+# Skip YAMNet (audio score 0) while the microphone only hears the noise floor
+AUDIO_VAD_GATE = True
+
+SHOW_DEBUG_WINDOW = True
+
+# Per-frame signals in the SignalSample table (with 1 s / 10 s rollups)
+STORE_SIGNALS = True
+
+# Record raw camera frames and microphone audio to recordings/<station>_eid<eid>/
+# for offline reprocessing (encoded in background threads, sheds quality under load)
+RECORD_SESSION = False
+RECORDINGS_DIR = "recordings"
+
+# Keep every frame's landmarks in landmarks/<station>_eid<eid>/ (memory-mapped,
+# ~2.9 KB per face per frame) so AU changes can be replayed without MediaPipe
+CACHE_LANDMARKS = False
+LANDMARKS_DIR = "landmarks"
+
+# Per-stage latency histograms (served on /metrics, summarized in the log)
+ENABLE_METRICS = True
+
+
+def main(
+    camera=None,
+    microphone=None,
+    open_browser=webbrowser.open,
+    show_window=SHOW_DEBUG_WINDOW,
+    log_path=None,
+    station_id=DEFAULT_STATION,
+    camera_index=CAMERA_INDEX,
+    audio_device=None
+):
+    """
+    Runs one participant session.
+
+    Sources and sinks are pluggable so the pipeline can run headless:
+      camera       - cv2.VideoCapture-like object (None = negotiate the webcam)
+      microphone   - sd.InputStream-like factory for YamnetAudio (None = sounddevice)
+      open_browser - called with the participant URL (None = don't open)
+      show_window  - show the OpenCV debug window
+
+    Several sessions can run in one process (see stations.py), one per
+    station_id; they share the web server, model files and DB writer.
+    """
+    if log_path is None:
+        log_path = "logs/log.txt" if station_id == DEFAULT_STATION else f"logs/log_{station_id}.txt"
+
+    METRICS.enabled = ENABLE_METRICS
+    submit_write(init_db).result()
 
-def main():
     # ---------- 1. Prepare Content (Playlist) ----------
     print("Generating playlist...")
-    playlist_ids = get_random_playlist()
-    set_playlist(playlist_ids)
-
-    # ---------- 2. Start Web Server (Background) ----------
+    if PLAYLIST_POLICY == "random":
+        playlist = get_random_playlist()
+    else:
+        playlist = get_scored_playlist(PLAYLIST_POLICY)
+    video_state = register_station(station_id)
+    set_playlist(playlist, station_id)
+
+    # ---------- 2. Start Web Server (Background, once per process) ----------
     print("Starting server...")
-    video_state = start_background_server()
+    start_background_server()
 
     # ---------- 3. Launch Browser for the User ----------
-    webbrowser.open("http://127.0.0.1:5000")
+    if open_browser is not None:
+        open_browser(station_url(station_id))
+
+    # ---------- Camera negotiation (while the participant fills in the form) ----------
+    if camera is None:
+        print("Negotiating camera mode...")
+        camera, capture_report = negotiate_capture(camera_index, target_fps=CAMERA_TARGET_FPS)
+        if capture_report is not None:
+            print(f"Camera: {capture_report}")
+        else:
+            print("Camera: could not measure any mode, keeping the camera's original settings")
 
     print("Waiting for participant registration...")
     while not video_state["ready_to_start"]:
@@ -56,26 +172,82 @@ def main():
 
     age = int(age_raw) if age_raw and str(age_raw).isdigit() else None
 
-    exp_type = "single"  # or "group" (later: add to form)
+    exp_type = EXPERIMENT_TYPE  # later: add to form
+    group = exp_type == "group"
 
-    sid = get_or_create_subject(name=name, age=age, gender=gender)
-    eid = create_experiment(sid=sid, exp_type=exp_type)
+    sid = submit_write(get_or_create_subject, name=name, age=age, gender=gender).result()
+    eid = submit_write(create_experiment, sid=sid, exp_type=exp_type).result()
     print(f"DB: sid={sid}, eid={eid}")
 
     # ---------- Logger ----------
-    logger = TextLogger(file_path="logs/log.txt")
+    logger = TextLogger(file_path=log_path)
     logger.write_header(participant)
 
     # ---------- Audio ----------
-    audio = YamnetAudio()
+    audio = YamnetAudio(
+        stream_factory=microphone,
+        device=audio_device,
+        gate=AUDIO_VAD_GATE,
+        backend=AUDIO_BACKEND,
+        num_threads=AUDIO_NUM_THREADS
+    )
+    print(
+        f"Audio: YAMNet on {audio.backend} ({AUDIO_NUM_THREADS} threads), "
+        f"capturing at {audio.capture_rate} Hz"
+    )
+
+    # ---------- Raw recording ----------
+    recorder = None
+    if RECORD_SESSION:
+        recorder = SessionRecorder(
+            f"{RECORDINGS_DIR}/{station_id}_eid{eid}",
+            fps=CAMERA_TARGET_FPS,
+            # Audio is stored as captured, before resampling
+            sample_rate=audio.capture_rate,
+            # Frames are stored as captured; with mirrored landmarks they are not flipped
+            flipped=not FACE_MIRROR_LANDMARKS
+        ).start()
+        audio.block_sink = recorder.add_audio
+
     audio.start()
 
     # ---------- Video + Face Tracking ----------
-    tracker = FaceTracker(model_path="models/face_landmarker.task")
+    tracker = FaceTracker(
+        model_path="models/face_landmarker.task",
+        live_stream=FACE_LIVE_STREAM,
+        roi_tracking=FACE_ROI_TRACKING and not group,
+        keyframe_interval=0 if group else FACE_KEYFRAME_INTERVAL,
+        num_faces=MAX_GROUP_FACES if group else 1,
+        mirror_landmarks=FACE_MIRROR_LANDMARKS,
+        native_format=FACE_NATIVE_FORMAT,
+        cap=camera
+    )
+
+    landmark_cache = None
+    if CACHE_LANDMARKS:
+        landmark_cache = LandmarkCacheWriter(
+            f"{LANDMARKS_DIR}/{station_id}_eid{eid}",
+            max_faces=MAX_GROUP_FACES if group else 1,
+            mirrored=FACE_MIRROR_LANDMARKS
+        )
 
     # ---------- Feature extraction ----------
     feature_extractor = FacialFeatureExtractor(baseline_frames=BASELINE_FRAMES)
 
+    # Baselines are per camera: lens and placement change the face geometry
+    camera_key = f"camera{camera_index}"
+    if USE_BASELINE_CACHE and not group:
+        cached = load_subject_baseline(sid, camera_key)
+        if cached is not None:
+            feature_extractor.load_baseline(BaselineStats(**cached))
+            print(f"Baseline: loaded cached baseline for sid={sid} on {camera_key}")
+
+    # Group mode: per-face identities, baselines, smoothers and totals
+    identities = FaceIdentityTracker()
+    group_extractor = GroupFeatureExtractor(baseline_frames=BASELINE_FRAMES)
+    face_smoothers = {}     # face id -> (au25, au12, au6) smoothers
+    face_totals = {}        # face id -> [frames, score sum]
+
     # ---------- Smoothing ----------
     au25_smoother = EMASmoother(alpha=SMOOTHING_ALPHA)
     au12_smoother = EMASmoother(alpha=SMOOTHING_ALPHA)
@@ -86,15 +258,32 @@ def main():
     scorer = AmusementScorer()
 
     # ---------- UI (Debug) ----------
-    #overlay = ScoreOverlay()
-    #au_debug = AUDebugOverlay()
+    if show_window:
+        overlay = ScoreOverlay()
+        au_debug = AUDebugOverlay()
 
     # ---------- DB aggregation state ----------
     last_video_id = None
-    video_samples = []
-    all_samples = []
+    # Constant-memory aggregates instead of per-frame sample lists
+    video_stats = ScoreAggregate()
+    session_stats = ScoreAggregate()
+    laugh_detector = LaughEpisodeDetector()
+    # Fire-and-forget writes; a failure is raised here, not lost in the writer thread
+    writes = PendingWrites()
+    signals = SignalBuffer(eid, writes=writes) if STORE_SIGNALS else None
+    laugh_events = 0
     saved_video_ids = set()
 
+    # ---------- Metrics ----------
+    # Process-wide: with several stations the histograms cover all of them
+    if station_id == DEFAULT_STATION:
+        METRICS.reset()
+    fps_meter = RateMeter()
+
+    # Face signals of the latest fresh landmarks
+    smoothed_au25 = smoothed_au12 = smoothed_au6 = 0.0
+    smoothed_faces = []     # (face id, au25, au12, au6)
+
     # ---------- Main loop ----------
     try:
         while True:
@@ -102,28 +291,74 @@ def main():
                 print("Playlist finished. Ending session.")
                 break
 
+            writes.check()
+            frame_t0 = METRICS.start()
+
             frame, landmarks, size = tracker.read()
             if frame is None:
                 break
+            if recorder is not None:
+                recorder.add_frame(
+                    frame,
+                    video_state["current_video_id"],
+                    playback_position(video_state) if video_state["is_playing"] else None,
+                    t=tracker.capture_time
+                )
 
-            if landmarks is not None:
-                w, h = size
-                au25, au12, au6 = feature_extractor.update(landmarks, w, h)
-            else:
-                au25 = au12 = au6 = 0.0
-
-            smoothed_au25 = au25_smoother.update(au25)
-            smoothed_au12 = au12_smoother.update(au12)
-            smoothed_au6 = au6_smoother.update(au6)
-            smoothed_audio = audio_smoother.update(yamnet_audio.audio_laughter_score)
-
-            au_debug.draw(
-                frame,
-                au25=smoothed_au25,
-                au12=smoothed_au12,
-                au6=smoothed_au6,
-                audio=smoothed_audio
-            )
+            # LIVE_STREAM: landmarks that were already used on an earlier frame
+            # must not advance the baselines and smoothers a second time
+            if tracker.fresh:
+                t0 = METRICS.start()
+                face_features = []
+                if group:
+                    faces = tracker.faces()
+                    # Only the feature and face-box landmarks, not all 478 per face
+                    points = landmarks_to_array(faces, GROUP_LANDMARKS) if faces else None
+                    face_ids = identities.update(boxes_from_points(points) if faces else [])
+                    for fid in identities.retired:
+                        group_extractor.forget(fid)
+                        face_smoothers.pop(fid, None)
+
+                    if faces:
+                        w, h = size
+                        au25s, au12s, au6s = group_extractor.update(points, face_ids, w, h)
+                        face_features = list(zip(face_ids, au25s, au12s, au6s))
+                        # The room-level signal is the mean over faces
+                        au25, au12, au6 = float(au25s.mean()), float(au12s.mean()), float(au6s.mean())
+                    else:
+                        au25 = au12 = au6 = 0.0
+                elif landmarks is not None:
+                    w, h = size
+                    au25, au12, au6 = feature_extractor.update(landmarks, w, h)
+                else:
+                    au25 = au12 = au6 = 0.0
+                METRICS.observe("features", t0)
+
+                if landmark_cache is not None:
+                    if group:
+                        cached, cached_ids = (landmarks_to_array(faces), face_ids) if faces else (None, None)
+                    else:
+                        cached = landmarks_to_array([landmarks]) if landmarks is not None else None
+                        cached_ids = None
+                    landmark_cache.append(
+                        tracker.latest_timestamp_ms, cached, cached_ids,
+                        video_id=video_state["current_video_id"],
+                        play_time=playback_position(video_state) if video_state["is_playing"] else None,
+                        frame_size=size
+                    )
+
+                smoothed_au25 = au25_smoother.update(au25)
+                smoothed_au12 = au12_smoother.update(au12)
+                smoothed_au6 = au6_smoother.update(au6)
+
+                smoothed_faces = []
+                for fid, f25, f12, f6 in face_features:
+                    sm = face_smoothers.get(fid)
+                    if sm is None:
+                        sm = face_smoothers[fid] = tuple(EMASmoother(alpha=SMOOTHING_ALPHA) for _ in range(3))
+                    smoothed_faces.append((fid, sm[0].update(float(f25)), sm[1].update(float(f12)), sm[2].update(float(f6))))
+
+            smoothed_audio = audio_smoother.update(audio.laughter_score)
 
             scores = scorer.compute(
                 au25=smoothed_au25,
@@ -132,11 +367,18 @@ def main():
                 audio=smoothed_audio
             )
 
+            face_scores = [
+                (fid, scorer.compute(au25=s25, au12=s12, au6=s6, audio=smoothed_audio).amusement)
+                for fid, s25, s12, s6 in smoothed_faces
+            ]
+
             current_video_id = video_state["current_video_id"]
             is_playing = video_state["is_playing"]
             video_time = video_state["video_time"]
+            play_time = playback_position(video_state)
 
             if is_playing:
+                t0 = METRICS.start()
                 logger.try_log(
                     timestamp=video_time,
                     video_id=current_video_id,
@@ -148,47 +390,167 @@ def main():
                     laughter=scores.laughter,
                     amusement=scores.amusement
                 )
+                METRICS.observe("log", t0)
+
+                session_stats.add(scores.amusement, play_time)
 
-                all_samples.append(scores.amusement)
+                for fid, amusement in face_scores:
+                    totals = face_totals.setdefault(fid, [0, 0.0])
+                    totals[0] += 1
+                    totals[1] += amusement
 
                 if current_video_id and current_video_id not in ("WAITING", "UNKNOWN"):
-                    if video_exists(current_video_id):
+                    t0 = METRICS.start()
+                    exists = video_exists(current_video_id)
+                    METRICS.observe("db_lookup", t0)
+
+                    if exists:
                         if last_video_id is None:
                             last_video_id = current_video_id
 
                         if current_video_id != last_video_id:
-                            if video_samples and (last_video_id not in saved_video_ids):
-                                mean_score = sum(video_samples) / len(video_samples)
-                                save_video_score(eid=eid, vid=last_video_id, score=mean_score)
+                            if video_stats.count and (last_video_id not in saved_video_ids):
+                                writes.submit(save_video_score, eid=eid, vid=last_video_id,
+                                              score=video_stats.mean, stats=video_stats.summary())
+                                observe_score(last_video_id, video_stats.mean)
                                 saved_video_ids.add(last_video_id)
 
-                            last_video_id = current_video_id
-                            video_samples = []
+                            episode = laugh_detector.flush()
+                            if episode is not None:
+                                writes.submit(save_laugh_events, eid=eid, vid=last_video_id, episodes=[episode])
+                                laugh_events += 1
 
-                        video_samples.append(scores.amusement)
+                            last_video_id = current_video_id
+                            video_stats = ScoreAggregate()
+
+                        video_stats.add(scores.amusement, play_time)
+
+                        episode = laugh_detector.update(scores.amusement, play_time)
+                        if episode is not None:
+                            writes.submit(save_laugh_events, eid=eid, vid=current_video_id, episodes=[episode])
+                            laugh_events += 1
+
+                        if signals is not None:
+                            signals.add(
+                                current_video_id, play_time,
+                                au25=smoothed_au25,
+                                au12=smoothed_au12,
+                                au6=smoothed_au6,
+                                audio=smoothed_audio,
+                                smile=scores.smile,
+                                laughter=scores.laughter,
+                                amusement=scores.amusement
+                            )
 
             # Debug UI window (optional)
-            overlay.draw(frame, scores=scores, audio_score=smoothed_audio)
-            cv2.imshow("Amusement Detection Debug", frame)
+            if show_window:
+                t0 = METRICS.start()
+                view = tracker.display_frame(frame)
+                au_debug.draw(
+                    view,
+                    au25=smoothed_au25,
+                    au12=smoothed_au12,
+                    au6=smoothed_au6,
+                    audio=smoothed_audio
+                )
+                overlay.draw(view, scores=scores, audio_score=smoothed_audio)
+                cv2.imshow("Amusement Detection Debug", view)
+                key = cv2.waitKey(1)
+                METRICS.observe("display", t0)
 
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+                if key & 0xFF == 27:
+                    break
+
+            METRICS.observe("frame", frame_t0)
+            METRICS.inc("frames")
+            METRICS.set_gauge("fps", fps_meter.tick())
+            if tracker.live_stream:
+                METRICS.set_gauge("landmark_lag_ms", tracker.result_lag_ms() or 0)
 
             time.sleep(0.01)
 
     finally:
         # ---------- Finalize DB writes ----------
-        if last_video_id and video_samples and (last_video_id not in saved_video_ids):
-            mean_score = sum(video_samples) / len(video_samples)
-            save_video_score(eid=eid, vid=last_video_id, score=mean_score)
+        if last_video_id and video_stats.count and (last_video_id not in saved_video_ids):
+            writes.submit(save_video_score, eid=eid, vid=last_video_id,
+                          score=video_stats.mean, stats=video_stats.summary())
+            observe_score(last_video_id, video_stats.mean)
             saved_video_ids.add(last_video_id)
 
-        total_score = (sum(all_samples) / len(all_samples)) if all_samples else 0.0
-        finalize_experiment(eid=eid, total_score=total_score)
-        print(f"DB: finalized experiment {eid} total_score={total_score:.4f}")
+        episode = laugh_detector.flush()
+        if last_video_id and episode is not None:
+            writes.submit(save_laugh_events, eid=eid, vid=last_video_id, episodes=[episode])
+            laugh_events += 1
+        print(f"DB: {laugh_events} laughter episodes")
+
+        if signals is not None:
+            signals.flush()
+            print(f"DB: {signals.written} signal samples")
+
+        if USE_BASELINE_CACHE and not group:
+            baseline = feature_extractor.baseline()
+            if baseline is not None:
+                writes.submit(save_subject_baseline, sid=sid, camera=camera_key, baseline=baseline._asdict())
+            print(f"Baseline: {feature_extractor.baseline_source}")
+
+        total_score = session_stats.mean if session_stats.count else 0.0
+        writes.submit(finalize_experiment, eid=eid, total_score=total_score, stats=session_stats.summary())
+
+        if face_totals:
+            writes.submit(save_face_scores, eid=eid, face_scores={
+                fid: (n, total / n) for fid, (n, total) in face_totals.items() if n
+            })
+            print(f"DB: saved scores for {len(face_totals)} faces")
+
+        write_error = None
+        try:
+            writes.wait()
+            print(f"DB: finalized experiment {eid} total_score={total_score:.4f}")
+        except Exception as e:
+            # Finish the cleanup below, then fail the session
+            write_error = e
+            print(f"DB: experiment {eid} NOT fully saved: {e!r}")
+
+        if FACE_LIVE_STREAM:
+            print(
+                f"Face tracker: {tracker.completed_frames}/{tracker.submitted_frames} "
+                f"frames processed, {tracker.dropped_frames} dropped"
+            )
+
+        if audio.gate is not None:
+            print(
+                f"Audio: {audio.executed_invocations} inferences, "
+                f"{audio.skipped_invocations} skipped by the voice activity gate"
+            )
+
+        if tracker.propagator is not None:
+            p = tracker.propagator
+            print(
+                f"Face tracker: {p.keyframes} keyframes, {p.propagated} propagated, "
+                f"{p.drift_resets} drift / {p.motion_resets} motion re-detects"
+            )
+
+        if landmark_cache is not None:
+            landmark_cache.close()
+            print(f"Landmarks: cached {landmark_cache.count} frames in {landmark_cache.directory}")
+
+        if recorder is not None:
+            rec = recorder.close()
+            print(
+                f"Recorder: {rec['frames_written']}/{rec['frames_offered']} frames written "
+                f"({rec['frames_shed']} shed, {rec['frames_dropped']} dropped), "
+                f"{rec['audio_samples']} audio samples -> {recorder.out_dir}"
+            )
+
+        if METRICS.enabled:
+            logger.write_metrics(METRICS.summary_lines())
 
         tracker.release()
-        cv2.destroyAllWindows()
+        if show_window:
+            cv2.destroyAllWindows()
+
+        if write_error is not None:
+            raise write_error
 
 
 if __name__ == "__main__":
@@ -3,5 +3,13 @@ from sqlalchemy.orm import sessionmaker
 
 DATABASE_URL = "sqlite:///app.db"
 
-engine = create_engine(DATABASE_URL, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
\ No newline at end of file
+# Several stations may share one database; wait for locks instead of failing
+engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args={"timeout": 30})
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+
+def init_db():
+    """Creates tables that exist in the models but not yet in the database."""
+    from persistence.models import Base
+    # Tools (bench, soak) may rebind SessionLocal to another database
+    Base.metadata.create_all(SessionLocal.kw.get("bind") or engine)
@@ -0,0 +1,283 @@
+"""
+Columnar export of the study for offline analysis.
+
+Streams finished experiments (with subject and video metadata), their
+per-video scores, laughter episodes and per-frame signals out of the
+database in chunks. Each dataset is written as Parquet when pyarrow is
+installed, otherwise as one memory-mappable .npy file per column.
+manifest.json records what was exported; later runs only add the
+experiments that finished since (as a new part). Video ids are stored
+as int32 codes ("video" columns) into manifest["videos"], which only
+grows, so codes are the same in every part.
+
+Run from the app/ directory:
+    python -m persistence.export --out export/
+    python -m persistence.export --out export/ --format npy
+
+Load in a notebook:
+    from persistence.export import load_dataset
+    signals = load_dataset("export/", "signals")      # column -> array
+    vids = load_videos("export/")[signals["video"]]   # codes -> YouTube ids
+"""
+import argparse
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import text
+
+from persistence.db import SessionLocal, engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CHUNK_ROWS = 50_000
+MANIFEST = "manifest.json"
+
+# dataset -> (source table, SQL selecting rows of the exported experiments, [(column, numpy dtype)])
+# Integer NULLs are exported as -1, float NULLs as NaN. Subject names are not exported.
+# "video" columns select Video.vid and are written as codes into manifest["videos"].
+DATASETS = {
+    "experiments": (
+        "Experiment",
+        "SELECT e.eid, e.sid, s.age, s.gender, e.type, e.total_score "
+        "FROM Experiment e JOIN Subject s ON s.sid = e.sid "
+        "WHERE e.eid IN ({eids}) ORDER BY e.eid",
+        [("eid", "i8"), ("sid", "i8"), ("age", "i8"), ("gender", "U20"),
+         ("type", "U8"), ("total_score", "f8")],
+    ),
+    "experiment_videos": (
+        "ExperimentVideo",
+        "SELECT ev.eid, ev.vid AS video, v.duration, ev.score "
+        "FROM ExperimentVideo ev JOIN Video v ON v.vid = ev.vid "
+        "WHERE ev.eid IN ({eids}) ORDER BY ev.eid",
+        [("eid", "i8"), ("video", "i4"), ("duration", "i8"), ("score", "f8")],
+    ),
+    "laugh_events": (
+        "LaughEvent",
+        "SELECT eid, vid AS video, onset, offset, peak, peak_time, intensity "
+        "FROM LaughEvent WHERE eid IN ({eids}) ORDER BY eid, vid, onset",
+        [("eid", "i8"), ("video", "i4"), ("onset", "f8"), ("offset", "f8"),
+         ("peak", "f8"), ("peak_time", "f8"), ("intensity", "f8")],
+    ),
+    "signals": (
+        "SignalSample",
+        "SELECT eid, vid AS video, t, au25, au12, au6, audio, smile, laughter, amusement "
+        "FROM SignalSample WHERE eid IN ({eids}) ORDER BY eid, vid, t",
+        [("eid", "i8"), ("video", "i4"), ("t", "f8"), ("au25", "f4"), ("au12", "f4"),
+         ("au6", "f4"), ("audio", "f4"), ("smile", "f4"), ("laughter", "f4"), ("amusement", "f4")],
+    ),
+}
+
+
+def _column(values, dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return np.array([np.nan if v is None else v for v in values], dtype=dtype)
+    if dtype.kind == "i":
+        return np.array([-1 if v is None else v for v in values], dtype=dtype)
+    return np.array(["" if v is None else str(v) for v in values], dtype=dtype)
+
+
+class _VideoCodes:
+    """Maps Video.vid to its index in manifest["videos"], appending new ids."""
+
+    def __init__(self, videos):
+        self.videos = videos
+        self.index = {vid: i for i, vid in enumerate(videos)}
+
+    def encode(self, values):
+        codes = []
+        for vid in values:
+            code = self.index.get(vid)
+            if code is None and vid is not None:
+                code = self.index[vid] = len(self.videos)
+                self.videos.append(vid)
+            codes.append(code)
+        return codes
+
+
+@contextmanager
+def _snapshot(conn):
+    """
+    Read transaction: the row count and the streamed rows see the same
+    database state, so rows inserted meanwhile cannot overflow the
+    preallocated .npy files.
+    """
+    conn.commit()
+    conn.exec_driver_sql("BEGIN")
+    try:
+        yield
+    finally:
+        conn.rollback()
+
+
+def _chunks(conn, sql):
+    result = conn.execution_options(stream_results=True).execute(text(sql))
+    for rows in result.partitions(CHUNK_ROWS):
+        yield list(zip(*rows))
+
+
+class _NpyWriter:
+    """One preallocated, memory-mapped .npy file per column."""
+
+    def __init__(self, directory, schema, n_rows):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.arrays = {
+            name: np.lib.format.open_memmap(directory / f"{name}.npy", mode="w+", dtype=dtype, shape=(n_rows,))
+            for name, dtype in schema
+        }
+        self.schema = schema
+        self.pos = 0
+
+    def write(self, cols):
+        n = len(cols[0])
+        for (name, dtype), values in zip(self.schema, cols):
+            self.arrays[name][self.pos:self.pos + n] = _column(values, dtype)
+        self.pos += n
+
+    def close(self):
+        for arr in self.arrays.values():
+            arr.flush()
+        self.arrays = {}
+
+
+class _ParquetWriter:
+    """One Parquet file; each chunk becomes a row group."""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self.writer = None
+
+    def write(self, cols):
+        table = pa.table({name: _column(values, dtype) for (name, dtype), values in zip(self.schema, cols)})
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _existing_tables(conn):
+    return {r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type='table'"))}
+
+
+def export(out_dir, fmt=None):
+    """Exports experiments finished since the last run; returns the new part (or None)."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fmt = fmt or ("parquet" if pq is not None else "npy")
+    if fmt == "parquet" and pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow), or use --format npy")
+
+    manifest_path = out_dir / MANIFEST
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {"parts": []}
+    done = {eid for part in manifest["parts"] for eid in part["eids"]}
+    codes = _VideoCodes(manifest.setdefault("videos", []))
+
+    bind = SessionLocal.kw.get("bind") or engine
+    with bind.connect() as conn:
+        finished = [r[0] for r in conn.execute(text(
+            "SELECT eid FROM Experiment WHERE total_score IS NOT NULL ORDER BY eid"
+        ))]
+        eids = [eid for eid in finished if eid not in done]
+        if not eids:
+            return None
+
+        part_name = f"part-{len(manifest['parts']):05d}"
+        part = {"name": part_name, "format": fmt, "created": time.time(), "eids": eids, "datasets": {}}
+        eid_list = ",".join(str(int(e)) for e in eids)
+        tables = _existing_tables(conn)
+
+        for name, (source, sql, schema) in DATASETS.items():
+            if source not in tables:
+                continue
+            sql = sql.format(eids=eid_list)
+            video_col = [c for c, _ in schema].index("video") if "video" in dict(schema) else None
+
+            with _snapshot(conn):
+                n_rows = conn.execute(text(f"SELECT COUNT(*) FROM ({sql})")).scalar()
+                if fmt == "parquet":
+                    target = out_dir / part_name / f"{name}.parquet"
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    writer = _ParquetWriter(target, schema)
+                else:
+                    target = out_dir / part_name / name
+                    writer = _NpyWriter(target, schema, n_rows)
+                try:
+                    for cols in _chunks(conn, sql):
+                        if video_col is not None:
+                            cols[video_col] = codes.encode(cols[video_col])
+                        writer.write(cols)
+                finally:
+                    writer.close()
+
+            part["datasets"][name] = {
+                "path": str(target.relative_to(out_dir)),
+                "rows": n_rows,
+                "columns": {c: d for c, d in schema},
+            }
+
+    manifest["parts"].append(part)
+    tmp = manifest_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(manifest_path)
+    return part
+
+
+def load_dataset(out_dir, name, columns=None):
+    """
+    column -> numpy array over all exported parts. With a single npy part
+    the arrays are memory-mapped; several parts are concatenated.
+    """
+    out_dir = Path(out_dir)
+    manifest = json.loads((out_dir / MANIFEST).read_text())
+    pieces = {}
+    for part in manifest["parts"]:
+        info = part["datasets"].get(name)
+        if info is None or info["rows"] == 0:
+            continue
+        wanted = columns or list(info["columns"])
+        if part["format"] == "parquet":
+            table = pq.read_table(out_dir / info["path"], columns=wanted)
+            arrays = {c: table.column(c).to_numpy() for c in wanted}
+        else:
+            arrays = {c: np.load(out_dir / info["path"] / f"{c}.npy", mmap_mode="r") for c in wanted}
+        for c, arr in arrays.items():
+            pieces.setdefault(c, []).append(arr)
+    return {c: arrs[0] if len(arrs) == 1 else np.concatenate(arrs) for c, arrs in pieces.items()}
+
+
+def load_videos(out_dir):
+    """Video ids indexed by the exported "video" codes."""
+    manifest = json.loads((Path(out_dir) / MANIFEST).read_text())
+    return np.array(manifest.get("videos", []), dtype=object)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export finished experiments to columnar files")
+    parser.add_argument("--out", default="export", help="export directory (holds manifest.json)")
+    parser.add_argument("--format", choices=("parquet", "npy"), help="default: parquet if pyarrow is installed")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    part = export(args.out, args.format)
+    if part is None:
+        print("Nothing new to export.")
+        return
+    print(f"Exported {len(part['eids'])} experiments to {args.out}/{part['name']} "
+          f"({part['format']}, {time.perf_counter() - t0:.1f}s)")
+    for name, info in part["datasets"].items():
+        print(f"  {name:<18} {info['rows']:>10} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from sqlalchemy.orm import DeclarativeBase, relationship
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, Table
+from sqlalchemy.orm import DeclarativeBase, declared_attr, relationship
+from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, Index, Table
 
 class Base(DeclarativeBase):
     pass
@@ -31,6 +31,7 @@ class Video(Base):
     link = Column(String(2048), nullable=False)
     duration = Column(Integer, nullable=False)
     status = Column(String, nullable=False, default="n/a")
+    category_id = Column(Integer, ForeignKey("Category.cid"), nullable=False)  # set by harvest_to_db.py
 
     categories = relationship("Category", secondary=video_category, back_populates="videos")
 
@@ -45,4 +46,120 @@ class ExperimentVideo(Base):
     __tablename__ = "ExperimentVideo"
     eid = Column(Integer, ForeignKey("Experiment.eid", ondelete="CASCADE"), primary_key=True)
     vid = Column(String(32), ForeignKey("Video.vid", ondelete="CASCADE"), primary_key=True)
-    score = Column(Float, nullable=True)
\ No newline at end of file
+    score = Column(Float, nullable=True)
+
+class ExperimentFace(Base):
+    """Per-face totals for group experiments (face ids are per-session track ids)."""
+    __tablename__ = "ExperimentFace"
+    eid = Column(Integer, ForeignKey("Experiment.eid", ondelete="CASCADE"), primary_key=True)
+    face_id = Column(Integer, primary_key=True)
+    frames = Column(Integer, nullable=False, default=0)
+    total_score = Column(Float, nullable=True)
+
+class SubjectBaseline(Base):
+    """Facial baseline of a returning subject, per camera (see FacialFeatureExtractor.load_baseline)."""
+    __tablename__ = "SubjectBaseline"
+    sid = Column(Integer, ForeignKey("Subject.sid", ondelete="CASCADE"), primary_key=True)
+    camera = Column(String(64), primary_key=True)
+    mouth_ratio = Column(Float, nullable=False)
+    mouth_ratio_var = Column(Float, nullable=False, default=0.0)
+    eye_opening = Column(Float, nullable=False)
+    eye_opening_var = Column(Float, nullable=False, default=0.0)
+    frame_width = Column(Integer, nullable=False)
+    frame_height = Column(Integer, nullable=False)
+    updated = Column(Float, nullable=False)  # unix time
+
+class ScoreStats(Base):
+    """
+    Streaming score aggregates (scoring.aggregates.ScoreAggregate) per
+    experiment video; scope "*" holds the whole session.
+    """
+    __tablename__ = "ScoreStats"
+    eid = Column(Integer, ForeignKey("Experiment.eid", ondelete="CASCADE"), primary_key=True)
+    scope = Column(String(32), primary_key=True)  # video id or SESSION_SCOPE
+    count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    variance = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    peak_time = Column(Float, nullable=True)     # playback position of the max
+    time_above = Column(Float, nullable=False)   # seconds at or above the amused threshold
+    p50 = Column(Float, nullable=True)
+    p90 = Column(Float, nullable=True)
+    p95 = Column(Float, nullable=True)
+    sketch = Column(String, nullable=True)       # JSON QuantileSketch, mergeable across rows
+
+class LaughEvent(Base):
+    """Laughter episodes (scoring.episodes.LaughEpisode); times are playback positions."""
+    __tablename__ = "LaughEvent"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    eid = Column(Integer, ForeignKey("Experiment.eid", ondelete="CASCADE"), nullable=False)
+    vid = Column(String(32), ForeignKey("Video.vid", ondelete="CASCADE"), nullable=False)
+    onset = Column(Float, nullable=False)
+    offset = Column(Float, nullable=False)
+    peak = Column(Float, nullable=False)
+    peak_time = Column(Float, nullable=False)
+    intensity = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_LaughEvent_eid_vid", "eid", "vid"),
+        Index("ix_LaughEvent_vid_onset", "vid", "onset"),
+    )
+
+class SignalSample(Base):
+    """Raw per-frame signals (persistence.signals); t is the playback position in seconds."""
+    __tablename__ = "SignalSample"
+    eid = Column(Integer, ForeignKey("Experiment.eid", ondelete="CASCADE"), primary_key=True)
+    vid = Column(String(32), ForeignKey("Video.vid", ondelete="CASCADE"), primary_key=True)
+    t = Column(Float, primary_key=True)
+    au25 = Column(Float, nullable=False)
+    au12 = Column(Float, nullable=False)
+    au6 = Column(Float, nullable=False)
+    audio = Column(Float, nullable=False)
+    smile = Column(Float, nullable=False)
+    laughter = Column(Float, nullable=False)
+    amusement = Column(Float, nullable=False)
+
+class SignalRollupMixin:
+    """Per-bucket sums of SignalSample; mean = sum_<signal> / n."""
+    @declared_attr
+    def eid(cls):
+        return Column(Integer, ForeignKey("Experiment.eid", ondelete="CASCADE"), primary_key=True)
+
+    @declared_attr
+    def vid(cls):
+        return Column(String(32), ForeignKey("Video.vid", ondelete="CASCADE"), primary_key=True)
+
+    bucket = Column(Integer, primary_key=True)   # floor(t / bucket width)
+    n = Column(Integer, nullable=False)
+    sum_au25 = Column(Float, nullable=False)
+    sum_au12 = Column(Float, nullable=False)
+    sum_au6 = Column(Float, nullable=False)
+    sum_audio = Column(Float, nullable=False)
+    sum_smile = Column(Float, nullable=False)
+    sum_laughter = Column(Float, nullable=False)
+    sum_amusement = Column(Float, nullable=False)
+    max_amusement = Column(Float, nullable=False)
+
+class SignalRollup1s(SignalRollupMixin, Base):
+    __tablename__ = "SignalRollup1s"
+
+class SignalRollup10s(SignalRollupMixin, Base):
+    __tablename__ = "SignalRollup10s"
+
+class VideoStats(Base):
+    """Running count/mean/M2 of ExperimentVideo.score per video (persistence.video_stats)."""
+    __tablename__ = "VideoStats"
+    vid = Column(String(32), ForeignKey("Video.vid", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    updated = Column(Float, nullable=True)  # unix time
+
+    __table_args__ = (
+        Index("ix_VideoStats_mean", "mean"),
+    )
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
@@ -1,6 +1,16 @@
-from typing import Optional
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
 from persistence.db import SessionLocal
-from persistence.models import Subject, Experiment, Video, ExperimentVideo
+from persistence.video_stats import update_video_stats
+from persistence.models import Subject, Experiment, Video, ExperimentVideo, ExperimentFace, SubjectBaseline, ScoreStats, LaughEvent
+
+SESSION_SCOPE = "*"
+
+BASELINE_FIELDS = (
+    "mouth_ratio", "mouth_ratio_var",
+    "eye_opening", "eye_opening_var",
+    "frame_width", "frame_height",
+)
 
 def get_or_create_subject(name: str, age: Optional[int], gender: Optional[str]) -> int:
     db = SessionLocal()
@@ -39,21 +49,70 @@ def video_exists(vid: str) -> bool:
     finally:
         db.close()
 
-def save_video_score(eid: int, vid: str, score: float) -> None:
+def save_video_score(eid: int, vid: str, score: float, stats: Optional[Dict[str, Any]] = None) -> None:
+    """stats: optional ScoreAggregate.summary(), stored in ScoreStats"""
     db = SessionLocal()
     try:
         row = ExperimentVideo(eid=eid, vid=vid, score=score)
         db.add(row)
+        if stats is not None:
+            db.merge(ScoreStats(eid=eid, scope=vid, **stats))
+        update_video_stats(db, vid, score)
         db.commit()
     finally:
         db.close()
 
-def finalize_experiment(eid: int, total_score: float) -> None:
+def finalize_experiment(eid: int, total_score: float, stats: Optional[Dict[str, Any]] = None) -> None:
     db = SessionLocal()
     try:
         e = db.query(Experiment).filter(Experiment.eid == eid).first()
         if e:
             e.total_score = total_score
+            if stats is not None:
+                db.merge(ScoreStats(eid=eid, scope=SESSION_SCOPE, **stats))
             db.commit()
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def save_face_scores(eid: int, face_scores: Dict[int, Tuple[int, float]]) -> None:
+    """face_scores: face_id -> (frames, mean score)"""
+    db = SessionLocal()
+    try:
+        for face_id, (frames, score) in face_scores.items():
+            db.merge(ExperimentFace(eid=eid, face_id=face_id, frames=frames, total_score=score))
+        db.commit()
+    finally:
+        db.close()
+
+def load_subject_baseline(sid: int, camera: str) -> Optional[Dict[str, float]]:
+    """Cached facial baseline of a subject on this camera, or None."""
+    db = SessionLocal()
+    try:
+        b = db.get(SubjectBaseline, (sid, camera))
+        if b is None:
+            return None
+        return {field: getattr(b, field) for field in BASELINE_FIELDS}
+    finally:
+        db.close()
+
+def save_subject_baseline(sid: int, camera: str, baseline: Dict[str, float]) -> None:
+    db = SessionLocal()
+    try:
+        db.merge(SubjectBaseline(sid=sid, camera=camera, updated=time.time(),
+                                 **{field: baseline[field] for field in BASELINE_FIELDS}))
+        db.commit()
+    finally:
+        db.close()
+
+def save_laugh_events(eid: int, vid: str, episodes: Iterable[Any]) -> None:
+    """episodes: scoring.episodes.LaughEpisode records of one video"""
+    db = SessionLocal()
+    try:
+        db.add_all([
+            LaughEvent(eid=eid, vid=vid, onset=e.onset, offset=e.offset,
+                       peak=e.peak, peak_time=e.peak_time, intensity=e.intensity)
+            for e in episodes
+        ])
+        db.commit()
+    finally:
+        db.close()
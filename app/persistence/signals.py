@@ -0,0 +1,190 @@
+"""
+Per-frame signal store.
+
+SignalSample keeps the raw per-frame signals of every session keyed by
+(eid, vid, t); SignalRollup1s / SignalRollup10s hold per-bucket sums
+that are updated in the same transaction as the raw insert, so
+analyses over many sessions can read the rollups instead of the raw
+rows. Raw rows can be pruned once they are no longer needed.
+
+Prune from the app/ directory:
+    python -m persistence.signals --keep-raw 50
+"""
+import argparse
+import math
+import time
+from collections import defaultdict
+
+from sqlalchemy import func, text
+
+from persistence.db import SessionLocal, init_db
+from persistence.models import SignalSample, SignalRollup1s, SignalRollup10s
+from persistence.writer import submit_write
+
+SIGNALS = ("au25", "au12", "au6", "audio", "smile", "laughter", "amusement")
+
+SIGNAL_BATCH_SIZE = 256      # samples per transaction
+SIGNAL_FLUSH_SECONDS = 2.0   # ...or this often, whichever comes first
+RAW_RETENTION_EXPERIMENTS = 200
+
+_INSERT_SAMPLES = text(
+    f"INSERT INTO SignalSample (eid, vid, t, {', '.join(SIGNALS)}) "
+    f"VALUES (:eid, :vid, :t, {', '.join(':' + s for s in SIGNALS)}) "
+    f"ON CONFLICT (eid, vid, t) DO NOTHING"
+)
+
+_EXISTING_TIMES = text(
+    "SELECT t FROM SignalSample WHERE eid = :eid AND vid = :vid AND t BETWEEN :t0 AND :t1"
+)
+
+
+def _upsert_rollup(table):
+    sums = ", ".join(f"sum_{s}" for s in SIGNALS)
+    return text(
+        f"INSERT INTO {table} (eid, vid, bucket, n, {sums}, max_amusement) "
+        f"VALUES (:eid, :vid, :bucket, :n, {', '.join(':sum_' + s for s in SIGNALS)}, :max_amusement) "
+        f"ON CONFLICT (eid, vid, bucket) DO UPDATE SET n = n + excluded.n, "
+        + ", ".join(f"sum_{s} = sum_{s} + excluded.sum_{s}" for s in SIGNALS)
+        + ", max_amusement = MAX(max_amusement, excluded.max_amusement)"
+    )
+
+
+ROLLUPS = (
+    (1.0, _upsert_rollup(SignalRollup1s.__tablename__)),
+    (10.0, _upsert_rollup(SignalRollup10s.__tablename__)),
+)
+
+
+def _rollup_rows(samples, width):
+    buckets = defaultdict(lambda: dict(n=0, max_amusement=-math.inf, **{f"sum_{s}": 0.0 for s in SIGNALS}))
+    for row in samples:
+        b = buckets[(row["eid"], row["vid"], int(row["t"] // width))]
+        b["n"] += 1
+        for s in SIGNALS:
+            b[f"sum_{s}"] += row[s]
+        b["max_amusement"] = max(b["max_amusement"], row["amusement"])
+    return [dict(eid=eid, vid=vid, bucket=bucket, **b) for (eid, vid, bucket), b in buckets.items()]
+
+
+def _new_samples(db, samples):
+    """
+    Samples whose (eid, vid, t) key is neither stored yet nor repeated
+    earlier in the batch (the first one wins, as with DO NOTHING).
+    """
+    times = defaultdict(list)
+    for row in samples:
+        times[(row["eid"], row["vid"])].append(row["t"])
+    seen = set()
+    for (eid, vid), ts in times.items():
+        for (t,) in db.execute(_EXISTING_TIMES, dict(eid=eid, vid=vid, t0=min(ts), t1=max(ts))):
+            seen.add((eid, vid, t))
+
+    new = []
+    for row in samples:
+        key = (row["eid"], row["vid"], row["t"])
+        if key not in seen:
+            seen.add(key)
+            new.append(row)
+    return new
+
+
+def write_signal_batch(samples):
+    """
+    Inserts raw samples and folds them into the rollups, in one transaction.
+    Samples already stored (same eid, vid, t) are skipped, so a batch that
+    is written twice is not counted twice in the rollups.
+    """
+    db = SessionLocal()
+    try:
+        samples = _new_samples(db, samples)
+        if not samples:
+            return
+        db.execute(_INSERT_SAMPLES, samples)
+        for width, upsert in ROLLUPS:
+            db.execute(upsert, _rollup_rows(samples, width))
+        db.commit()
+    finally:
+        db.close()
+
+
+def prune_signals(keep_raw_experiments=RAW_RETENTION_EXPERIMENTS, keep_1s_experiments=None):
+    """
+    Deletes raw samples (and optionally 1 s rollups) of all but the most
+    recent experiments. The rollups already contain their contribution,
+    and the 10 s rollups are always kept.
+    """
+    db = SessionLocal()
+    try:
+        deleted = {}
+        for model, keep in ((SignalSample, keep_raw_experiments), (SignalRollup1s, keep_1s_experiments)):
+            if keep is None:
+                continue
+            recent = db.query(model.eid).distinct().order_by(model.eid.desc()).limit(keep).subquery()
+            deleted[model.__tablename__] = (
+                db.query(model)
+                .filter(model.eid.notin_(db.query(recent.c.eid)))
+                .delete(synchronize_session=False)
+            )
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+class SignalBuffer:
+    """
+    Collects one session's per-frame signals and hands them to the DB
+    writer thread in batches (persistence.writer), so the frame loop
+    never waits on SQLite. With `writes` (a PendingWrites) failed batches
+    are raised in the session.
+    """
+
+    def __init__(self, eid, batch_size=SIGNAL_BATCH_SIZE, flush_seconds=SIGNAL_FLUSH_SECONDS, writes=None):
+        self.eid = eid
+        self.submit = writes.submit if writes is not None else submit_write
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rows = []
+        self.written = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, vid, t, **signals):
+        row = {"eid": self.eid, "vid": vid, "t": round(t, 3)}
+        for s in SIGNALS:
+            row[s] = float(signals[s])
+        self.rows.append(row)
+
+        if len(self.rows) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.rows:
+            return
+        self.submit(write_signal_batch, self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune raw per-frame signals that are already rolled up")
+    parser.add_argument("--keep-raw", type=int, default=RAW_RETENTION_EXPERIMENTS,
+                        help="keep raw samples of this many most recent experiments")
+    parser.add_argument("--keep-1s", type=int, default=None,
+                        help="also prune 1 s rollups, keeping this many experiments")
+    args = parser.parse_args(argv)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        before = db.query(func.count(SignalSample.eid)).scalar()
+    finally:
+        db.close()
+    deleted = prune_signals(args.keep_raw, args.keep_1s)
+    print(f"SignalSample rows before: {before}")
+    for table, n in deleted.items():
+        print(f"{table}: deleted {n} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Per-video reaction statistics across experiments.
+
+VideoStats holds count / mean / M2 (Welford) of ExperimentVideo.score
+per video. save_video_score() updates it in the same transaction as the
+score itself, so catalog questions ("top clips per category") are
+answered from VideoStats without scanning ExperimentVideo.
+
+Run from the app/ directory:
+    python -m persistence.video_stats --backfill
+    python -m persistence.video_stats --top memes --limit 20 --min-count 3
+"""
+import argparse
+import time
+from typing import Dict, List
+
+from sqlalchemy import text
+
+from persistence.db import SessionLocal, init_db
+from persistence.models import Category, Video, VideoStats
+
+
+def update_video_stats(db, vid: str, score: float) -> None:
+    """Folds one score into VideoStats; the caller commits."""
+    row = db.get(VideoStats, vid)
+    if row is None:
+        row = VideoStats(vid=vid, count=0, mean=0.0, m2=0.0)
+        db.add(row)
+
+    row.count += 1
+    delta = score - row.mean
+    row.mean += delta / row.count
+    row.m2 += delta * (score - row.mean)
+    row.updated = time.time()
+
+
+def backfill_video_stats() -> int:
+    """Rebuilds VideoStats from ExperimentVideo; returns the number of videos."""
+    db = SessionLocal()
+    try:
+        db.query(VideoStats).delete(synchronize_session=False)
+        # Sum of squares form of M2: fine for scores of this magnitude
+        db.execute(text(
+            "INSERT INTO VideoStats (vid, count, mean, m2, updated) "
+            "SELECT vid, COUNT(score), AVG(score), "
+            "       MAX(0.0, SUM(score * score) - COUNT(score) * AVG(score) * AVG(score)), :now "
+            "FROM ExperimentVideo WHERE score IS NOT NULL GROUP BY vid"
+        ), {"now": time.time()})
+        db.commit()
+        return db.query(VideoStats).count()
+    finally:
+        db.close()
+
+
+def top_videos(category: str = None, limit: int = 10, min_count: int = 1) -> List[Dict]:
+    """Videos ranked by mean score, optionally within one category."""
+    db = SessionLocal()
+    try:
+        q = db.query(VideoStats).filter(VideoStats.count >= min_count)
+        if category is not None:
+            q = (
+                q.join(Video, Video.vid == VideoStats.vid)
+                .join(Category, Category.cid == Video.category_id)
+                .filter(Category.name == category)
+            )
+        rows = q.order_by(VideoStats.mean.desc()).limit(limit).all()
+        return [
+            {
+                "vid": r.vid,
+                "count": r.count,
+                "mean": r.mean,
+                "variance": r.variance,
+                "updated": r.updated,
+            }
+            for r in rows
+        ]
+    finally:
+        db.close()
+
+
+def category_exists(name: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Category.cid).filter(Category.name == name).first() is not None
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-video reaction statistics")
+    parser.add_argument("--backfill", action="store_true", help="rebuild VideoStats from ExperimentVideo")
+    parser.add_argument("--top", metavar="CATEGORY", nargs="?", const="", default=None,
+                        help="list the best videos (of a category)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--min-count", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.backfill:
+        t0 = time.perf_counter()
+        n = backfill_video_stats()
+        print(f"Backfilled {n} videos in {time.perf_counter() - t0:.2f}s")
+
+    if args.top is not None:
+        if args.top and not category_exists(args.top):
+            parser.error(f"unknown category {args.top!r}")
+        for r in top_videos(args.top or None, args.limit, args.min_count):
+            print(f"{r['vid']}  mean={r['mean']:.4f}  sd={r['variance'] ** 0.5:.4f}  n={r['count']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# SQLite allows one writer at a time; funnel every write of the process
+# (all stations) through a single thread instead of contending on the lock.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+
+def _report_failure(fn):
+    def callback(future):
+        exc = future.exception()
+        if exc is not None:
+            print(f"DB: {getattr(fn, '__name__', fn)} failed:")
+            traceback.print_exception(type(exc), exc, exc.__traceback__)
+    return callback
+
+
+def submit_write(fn, *args, **kwargs):
+    """Queues a persistence.repo write; returns a Future with its result."""
+    future = _executor.submit(fn, *args, **kwargs)
+    # Printed at once, even if nobody ever calls result()
+    future.add_done_callback(_report_failure(fn))
+    return future
+
+
+def flush_writes():
+    """Blocks until every write queued so far has been committed."""
+    _executor.submit(lambda: None).result()
+
+
+class PendingWrites:
+    """
+    Fire-and-forget writes of one session.
+
+    Keeps their Futures so a failed write is raised in the session
+    (check() in the loop, wait() at the end) instead of being lost.
+    """
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = submit_write(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def check(self):
+        """Drops finished writes; re-raises the first one that failed."""
+        done, pending = [], []
+        for future in self.futures:
+            (done if future.done() else pending).append(future)
+        self.futures = pending
+        for future in done:
+            future.result()
+
+    def wait(self):
+        """flush_writes(), then re-raises the first failed write."""
+        flush_writes()
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
@@ -10,6 +10,7 @@ MAX_OVERAGE = 30               # allow +30s
 # =========================================
 
 def get_random_playlist():
+    """List of {"id": vid, "duration": seconds}; the player uses durations to schedule preloads."""
     db = SessionLocal()
     try:
         query = (
@@ -35,7 +36,7 @@ def get_random_playlist():
 
     for video in pool:
         if total_duration + video["duration"] <= TARGET_DURATION + MAX_OVERAGE:
-            playlist.append(video["id"])
+            playlist.append(video)
             total_duration += video["duration"]
 
         if total_duration >= TARGET_DURATION:
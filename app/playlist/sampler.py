@@ -0,0 +1,244 @@
+import math
+import random
+import threading
+
+from persistence.db import SessionLocal
+from persistence.models import Video, VideoStats
+from playlist.manager import TARGET_DURATION, MAX_OVERAGE
+
+# ================= CONFIG =================
+
+UCB_EXPLORATION = 0.3      # weight of the exploration bonus
+PRIOR_STRENGTH = 2.0       # pseudo-observations of the catalog mean per video
+TEMPERATURE = 0.1          # softmax temperature over the UCB index
+MAX_INDEX = 5.0            # clip the index so exp() stays finite
+CANDIDATE_FACTOR = 4       # thompson: candidates drawn per playlist slot
+MAX_DRAWS = 500            # give up filling the budget after this many draws
+REBUILD_GROWTH = 2.0       # recompute all weights when the observation count doubles
+
+# =========================================
+
+
+class FenwickSampler:
+    """
+    Weighted sampling over a fixed set of items with O(log n) draws and
+    O(log n) weight updates (binary indexed tree of prefix sums).
+    """
+
+    def __init__(self, weights):
+        self.n = len(weights)
+        self.weights = list(weights)
+        self.tree = [0.0] * (self.n + 1)
+        for i, w in enumerate(self.weights, start=1):
+            self.tree[i] += w
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+        self.step = 1 << max(self.n.bit_length() - 1, 0)
+
+    @property
+    def total(self):
+        total, i = 0.0, self.n
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, index, weight):
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def draw(self, rng=random):
+        """Index drawn with probability weight / total (None if all weights are 0)."""
+        total = self.total
+        if self.n == 0 or total <= 0.0:
+            return None
+        target = rng.random() * total
+
+        pos, step = 0, self.step
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        # Float round-off can run past the last item with weight
+        pos = min(pos, self.n - 1)
+        while pos >= 0 and self.weights[pos] <= 0.0:
+            pos -= 1
+        return pos if pos >= 0 else None
+
+
+class ScoreAwareSampler:
+    """
+    Builds playlists that favour clips which historically get reactions,
+    while still exploring clips with few or no sessions.
+
+    Each approved video gets a UCB index: its shrunk mean score plus an
+    exploration bonus that shrinks with the number of sessions. Videos
+    are drawn with softmax(index / TEMPERATURE) weights from a Fenwick
+    tree, so a playlist costs O(playlist length * log n) and a new score
+    only updates one weight. With policy="thompson" the drawn candidates
+    are re-ranked by a draw from each video's posterior of the mean.
+
+    Statistics come from VideoStats (see persistence.video_stats).
+    """
+
+    def __init__(self, policy="ucb", rng=None):
+        if policy not in ("ucb", "thompson"):
+            raise ValueError(f"Unknown policy: {policy}")
+        self.policy = policy
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.rebuild()
+
+    # ---------- Statistics ----------
+    def rebuild(self):
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Video.vid, Video.duration, VideoStats.count, VideoStats.mean, VideoStats.m2)
+                .outerjoin(VideoStats, VideoStats.vid == Video.vid)
+                .filter(Video.status == "approved", Video.duration.isnot(None))
+                .all()
+            )
+        finally:
+            db.close()
+
+        self.vids = [r[0] for r in rows]
+        self.durations = [r[1] for r in rows]
+        self.counts = [r[2] or 0 for r in rows]
+        self.means = [r[3] or 0.0 for r in rows]
+        self.m2 = [r[4] or 0.0 for r in rows]
+        self.index = {vid: i for i, vid in enumerate(self.vids)}
+        self.total_count = sum(self.counts)
+        self.reweight()
+
+    def reweight(self):
+        """Recomputes every weight from the in-memory statistics (O(n))."""
+        self.reweighted_at = max(self.total_count, 1)
+        self.prior_mean = (
+            sum(c * m for c, m in zip(self.counts, self.means)) / self.total_count
+            if self.total_count else 0.0
+        )
+        self.tree = FenwickSampler([self._weight(i) for i in range(len(self.vids))])
+
+    def _shrunk_mean(self, i):
+        n = self.counts[i]
+        return (n * self.means[i] + PRIOR_STRENGTH * self.prior_mean) / (n + PRIOR_STRENGTH)
+
+    def _weight(self, i):
+        bonus = UCB_EXPLORATION * math.sqrt(math.log(self.total_count + 2) / (self.counts[i] + 1))
+        index = min(self._shrunk_mean(i) + bonus, MAX_INDEX)
+        return math.exp(index / TEMPERATURE)
+
+    def observe(self, vid, score):
+        """Fold a new session score into the sampler (O(log n))."""
+        with self.lock:
+            i = self.index.get(vid)
+            if i is None:
+                return
+            self.counts[i] += 1
+            delta = score - self.means[i]
+            self.means[i] += delta / self.counts[i]
+            self.m2[i] += delta * (score - self.means[i])
+            self.total_count += 1
+
+            if self.total_count >= self.reweighted_at * REBUILD_GROWTH:
+                # The exploration bonus and prior of every video have moved
+                self.reweight()
+            else:
+                self.tree.update(i, self._weight(i))
+
+    def _posterior_draw(self, i):
+        n = self.counts[i]
+        var = self.m2[i] / (n - 1) if n > 1 else 0.25
+        return self.rng.gauss(self._shrunk_mean(i), math.sqrt(var / (n + PRIOR_STRENGTH)))
+
+    # ---------- Playlists ----------
+    def _item(self, i):
+        return {"id": self.vids[i], "duration": self.durations[i]}
+
+    def _draw(self, max_items=None):
+        """
+        Draws without replacement. Without max_items, keeps the draws that
+        fit the duration budget until it is filled; otherwise returns the
+        first max_items draws.
+        """
+        limit = TARGET_DURATION + MAX_OVERAGE
+        removed = {}            # index -> weight, restored afterwards
+        chosen = []
+        total_duration = 0
+        try:
+            for _ in range(MAX_DRAWS):
+                i = self.tree.draw(self.rng)
+                if i is None:
+                    break
+                removed[i] = self.tree.weights[i]
+                self.tree.update(i, 0.0)
+
+                if max_items is not None:
+                    chosen.append(i)
+                    if len(chosen) >= max_items:
+                        break
+                    continue
+
+                if total_duration + self.durations[i] <= limit:
+                    chosen.append(i)
+                    total_duration += self.durations[i]
+                if total_duration >= TARGET_DURATION:
+                    break
+        finally:
+            for i, w in removed.items():
+                self.tree.update(i, w)
+        return chosen
+
+    def playlist(self):
+        """Videos filling TARGET_DURATION (+ MAX_OVERAGE), in the format of get_random_playlist()."""
+        with self.lock:
+            if not self.vids:
+                return []
+            if self.policy == "ucb":
+                return [self._item(i) for i in self._draw()]
+
+            # Thompson: over-draw candidates, keep the best posterior draws that fit
+            mean_duration = max(sum(self.durations) / len(self.durations), 1.0)
+            slots = max(1, round(TARGET_DURATION / mean_duration))
+            candidates = self._draw(max_items=CANDIDATE_FACTOR * slots)
+
+            limit = TARGET_DURATION + MAX_OVERAGE
+            chosen, total_duration = [], 0
+            for i in sorted(candidates, key=self._posterior_draw, reverse=True):
+                if total_duration + self.durations[i] <= limit:
+                    chosen.append(i)
+                    total_duration += self.durations[i]
+                if total_duration >= TARGET_DURATION:
+                    break
+            return [self._item(i) for i in chosen]
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(policy="ucb"):
+    """Process-wide sampler (shared by all stations), built on first use."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None or _sampler.policy != policy:
+            _sampler = ScoreAwareSampler(policy)
+        return _sampler
+
+
+def observe_score(vid, score):
+    """Updates the shared sampler, if one has been built."""
+    if _sampler is not None:
+        _sampler.observe(vid, score)
+
+
+def get_scored_playlist(policy="ucb"):
+    return get_sampler(policy).playlist()
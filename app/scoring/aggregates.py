@@ -0,0 +1,183 @@
+import json
+import math
+
+AMUSED_THRESHOLD = 0.2       # amusement score counted as "amused" for time_above
+MAX_SAMPLE_GAP = 1.0         # seconds; longer gaps (pauses, seeks) are not counted
+SKETCH_ACCURACY = 0.01       # relative error of the quantile sketch
+SKETCH_MIN_VALUE = 1e-6      # values below this (in magnitude) count as zero
+QUANTILES = (0.5, 0.9, 0.95)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy (DDSketch).
+
+    Values fall into logarithmic buckets of width (1 + a) / (1 - a), so
+    any quantile is returned within a relative error `a`. Memory grows
+    with the log of the value range, not with the number of values, and
+    two sketches merge by adding their bucket counts.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1.0 + accuracy) / (1.0 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        self.count = 0
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, key):
+        # Bucket midpoint (in the relative sense) of (gamma^(k-1), gamma^k]
+        return 2.0 * self.gamma ** key / (self.gamma + 1.0)
+
+    def add(self, value):
+        self.count += 1
+        if value > SKETCH_MIN_VALUE:
+            k = self._key(value)
+            self.positive[k] = self.positive.get(k, 0) + 1
+        elif value < -SKETCH_MIN_VALUE:
+            k = self._key(-value)
+            self.negative[k] = self.negative.get(k, 0) + 1
+        else:
+            self.zero += 1
+
+    def merge(self, other):
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for k, n in other.positive.items():
+            self.positive[k] = self.positive.get(k, 0) + n
+        for k, n in other.negative.items():
+            self.negative[k] = self.negative.get(k, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+
+        seen = 0
+        for k in sorted(self.negative, reverse=True):
+            seen += self.negative[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.positive):
+            seen += self.positive[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def to_dict(self):
+        return {
+            "accuracy": self.accuracy,
+            "positive": self.positive,
+            "negative": self.negative,
+            "zero": self.zero,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["accuracy"])
+        sketch.positive = {int(k): n for k, n in data["positive"].items()}
+        sketch.negative = {int(k): n for k, n in data["negative"].items()}
+        sketch.zero = data["zero"]
+        sketch.count = sketch.zero + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+
+class ScoreAggregate:
+    """
+    Constant-memory summary of a score stream (one video or a session).
+
+    add(value, t) keeps a running mean/variance (Welford), min/max, the
+    time spent at or above `threshold`, the time of the peak and a
+    quantile sketch. `t` is the playback position in seconds; time above
+    the threshold is integrated between consecutive samples.
+    Aggregates of disjoint streams can be combined with merge().
+    """
+
+    def __init__(self, threshold=AMUSED_THRESHOLD, max_gap=MAX_SAMPLE_GAP):
+        self.threshold = threshold
+        self.max_gap = max_gap
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.peak_time = None
+        self.time_above = 0.0
+        self.sketch = QuantileSketch()
+
+        self._last_t = None
+        self._last_above = False
+
+    def add(self, value, t=None):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+            self.peak_time = t
+
+        if t is not None:
+            if self._last_t is not None and self._last_above:
+                dt = t - self._last_t
+                if 0.0 < dt <= self.max_gap:
+                    self.time_above += dt
+            self._last_t = t
+            self._last_above = value >= self.threshold
+
+        self.sketch.add(value)
+
+    def merge(self, other):
+        """Combine with the aggregate of another (disjoint) stream."""
+        if other.count == 0:
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.mean += delta * other.count / n
+        self.count = n
+
+        if other.min < self.min:
+            self.min = other.min
+        if other.max > self.max:
+            self.max = other.max
+            self.peak_time = other.peak_time
+        self.time_above += other.time_above
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def summary(self):
+        """Plain dict for persistence (see persistence.models.ScoreStats)."""
+        if self.count == 0:
+            return None
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.variance,
+            "min": self.min,
+            "max": self.max,
+            "peak_time": self.peak_time,
+            "time_above": self.time_above,
+            "p50": self.sketch.quantile(QUANTILES[0]),
+            "p90": self.sketch.quantile(QUANTILES[1]),
+            "p95": self.sketch.quantile(QUANTILES[2]),
+            "sketch": json.dumps(self.sketch.to_dict()),
+        }
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+
+LAUGH_ON_THRESHOLD = 0.35    # amusement that starts an episode...
+LAUGH_OFF_THRESHOLD = 0.2    # ...and the level it has to fall below to end it
+MIN_EPISODE_SECONDS = 0.5    # shorter bursts are dropped
+MAX_SAMPLE_GAP = 1.0         # seconds without samples (pause, seek) end an episode
+SEEK_TOLERANCE = 0.25        # smaller backward steps are playback-clock jitter, not a seek
+
+
+@dataclass
+class LaughEpisode:
+    onset: float        # playback position (s)
+    offset: float
+    peak: float
+    peak_time: float
+    intensity: float    # mean amusement during the episode
+
+    @property
+    def duration(self):
+        return self.offset - self.onset
+
+
+class LaughEpisodeDetector:
+    """
+    Segments a fused amusement stream into laughter episodes.
+
+    Hysteresis: an episode starts when the score reaches `on_threshold`
+    and ends when it drops below `off_threshold`; episodes shorter than
+    `min_duration` are discarded. Samples are (score, playback time);
+    update() returns a LaughEpisode when one ends, otherwise None.
+
+    The playback time is extrapolated between player reports and snaps
+    back a little when a report arrives; backward steps up to
+    `seek_tolerance` are clamped to the previous time, only larger ones
+    count as a seek or clip change.
+    """
+
+    def __init__(
+        self,
+        on_threshold=LAUGH_ON_THRESHOLD,
+        off_threshold=LAUGH_OFF_THRESHOLD,
+        min_duration=MIN_EPISODE_SECONDS,
+        max_gap=MAX_SAMPLE_GAP,
+        seek_tolerance=SEEK_TOLERANCE
+    ):
+        if off_threshold > on_threshold:
+            raise ValueError("off_threshold must not exceed on_threshold")
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.min_duration = min_duration
+        self.max_gap = max_gap
+        self.seek_tolerance = seek_tolerance
+
+        self.active = False
+        self.last_t = None
+        self._reset_episode()
+
+    def _reset_episode(self):
+        self.onset = None
+        self.peak = 0.0
+        self.peak_time = None
+        self.total = 0.0
+        self.samples = 0
+
+    def _close(self, offset):
+        episode = None
+        if offset - self.onset >= self.min_duration:
+            episode = LaughEpisode(
+                onset=self.onset,
+                offset=offset,
+                peak=self.peak,
+                peak_time=self.peak_time,
+                intensity=self.total / self.samples
+            )
+        self.active = False
+        self._reset_episode()
+        return episode
+
+    def update(self, value, t):
+        episode = None
+        if self.last_t is not None and self.last_t - self.seek_tolerance <= t < self.last_t:
+            t = self.last_t
+
+        if self.active and (t < self.last_t or t - self.last_t > self.max_gap):
+            # Playback jumped: end the episode where the samples stopped
+            episode = self._close(self.last_t)
+
+        if self.active:
+            if value < self.off_threshold:
+                episode = self._close(t)
+            else:
+                self.total += value
+                self.samples += 1
+                if value > self.peak:
+                    self.peak = value
+                    self.peak_time = t
+        elif value >= self.on_threshold:
+            self.active = True
+            self.onset = t
+            self.peak = value
+            self.peak_time = t
+            self.total = value
+            self.samples = 1
+
+        self.last_t = t
+        return episode
+
+    def flush(self):
+        """Ends the stream (video changed or session over); returns a pending episode."""
+        episode = self._close(self.last_t) if self.active else None
+        self.last_t = None
+        return episode
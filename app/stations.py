@@ -0,0 +1,62 @@
+"""
+Runs several participant stations in one process.
+
+Each station gets its own camera, microphone, playlist, experiment and
+log, and is served under http://127.0.0.1:<SERVER_PORT>/s/<station_id>/
+(SERVER_PORT environment variable, default 5000). The
+web server, TensorFlow/MediaPipe runtimes, model files and the DB
+writer are shared, so N stations cost far less than N processes.
+
+Usage (from the app/ directory):
+    python stations.py --station A:0 --station B:1:2
+        station spec = <station_id>:<camera_index>[:<audio_device>]
+"""
+import argparse
+import threading
+import webbrowser
+
+import main as session
+
+
+def parse_station(spec):
+    parts = spec.split(":")
+    if len(parts) not in (2, 3) or not parts[0]:
+        raise argparse.ArgumentTypeError(f"Bad station spec: {spec}")
+    station_id = parts[0]
+    camera_index = int(parts[1])
+    audio_device = None
+    if len(parts) == 3:
+        audio_device = int(parts[2]) if parts[2].isdigit() else parts[2]
+    return station_id, camera_index, audio_device
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several stations in one process")
+    parser.add_argument("--station", action="append", type=parse_station, required=True,
+                        help="<station_id>:<camera_index>[:<audio_device>] (repeatable)")
+    parser.add_argument("--no-browser", action="store_true")
+    args = parser.parse_args()
+
+    threads = []
+    for station_id, camera_index, audio_device in args.station:
+        t = threading.Thread(
+            target=session.main,
+            name=f"station-{station_id}",
+            kwargs={
+                "station_id": station_id,
+                "camera_index": camera_index,
+                "audio_device": audio_device,
+                "open_browser": None if args.no_browser else webbrowser.open,
+                # OpenCV windows must be driven from the main thread
+                "show_window": False,
+            },
+        )
+        t.start()
+        threads.append(t)
+
+    for t in threads:
+        t.join()
+
+
+if __name__ == "__main__":
+    main()
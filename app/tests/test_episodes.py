@@ -0,0 +1,36 @@
+import numpy as np
+
+from scoring.episodes import LaughEpisodeDetector
+
+
+def _run(detector, values, times):
+    episodes = [detector.update(v, t) for v, t in zip(values, times)]
+    episodes.append(detector.flush())
+    return [e for e in episodes if e is not None]
+
+
+def test_jittered_playback_clock_keeps_one_episode():
+    # 30 fps samples; the extrapolated clock snaps back up to 40 ms at every 200 ms report
+    rng = np.random.default_rng(0)
+    times = np.arange(0.0, 6.0, 1 / 30)
+    jitter = np.where(np.arange(len(times)) % 6 == 0, -rng.uniform(0.0, 0.04, len(times)), 0.0)
+    values = np.where((times >= 1.0) & (times < 3.0), 0.6, 0.05)
+
+    episodes = _run(LaughEpisodeDetector(), values, times + jitter)
+
+    assert len(episodes) == 1
+    assert abs(episodes[0].onset - 1.0) < 0.05
+    assert abs(episodes[0].duration - 2.0) < 0.1
+
+
+def test_backward_seek_ends_the_episode():
+    times = [1.0, 1.1, 1.2, 1.3, 1.4, 1.5, 1.6, 0.2, 0.3]
+    values = [0.6] * len(times)
+
+    detector = LaughEpisodeDetector()
+    episodes = [detector.update(v, t) for v, t in zip(values, times)]
+
+    ended = [e for e in episodes if e is not None]
+    assert len(ended) == 1
+    assert (ended[0].onset, ended[0].offset) == (1.0, 1.6)
+    assert detector.active and detector.onset == 0.2
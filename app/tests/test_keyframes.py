@@ -0,0 +1,41 @@
+import numpy as np
+
+from face.keyframes import LandmarkPropagator
+from face.roi import Landmark
+
+W, H = 320, 240
+
+
+def _still_scene():
+    rng = np.random.default_rng(0)
+    gray = (rng.random((H // 8, W // 8)) * 255).astype(np.uint8)
+    return np.kron(gray, np.ones((8, 8), dtype=np.uint8))   # blocky texture LK can lock on to
+
+
+def _face():
+    # Every index the propagator tracks lies inside the textured frame
+    return [Landmark(0.3 + 0.4 * (i % 20) / 20, 0.3 + 0.4 * (i // 20) / 24, 0.0) for i in range(478)]
+
+
+def _count_detections(interval, n_frames):
+    gray, face = _still_scene(), _face()
+    propagator = LandmarkPropagator(interval=interval)
+    detections = 0
+    for _ in range(n_frames):
+        if propagator.propagate(gray, W, H) is None:
+            detections += 1
+            propagator.reset(gray, face, W, H)
+    return detections, propagator
+
+
+def test_landmarker_runs_every_interval_frames():
+    detections, propagator = _count_detections(interval=5, n_frames=30)
+    assert detections == 6
+    assert propagator.propagated == 24
+    assert propagator.drift_resets == propagator.motion_resets == 0
+
+
+def test_interval_one_detects_every_frame():
+    detections, propagator = _count_detections(interval=1, n_frames=10)
+    assert detections == 10
+    assert propagator.propagated == 0
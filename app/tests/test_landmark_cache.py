@@ -0,0 +1,24 @@
+import numpy as np
+
+from face import landmark_cache
+from face.landmark_cache import LandmarkCache, LandmarkCacheWriter
+
+
+def test_cache_grows_several_times(tmp_path, monkeypatch):
+    monkeypatch.setattr(landmark_cache, "GROW_FRAMES", 4)
+    rng = np.random.default_rng(0)
+    points = rng.random((11, 1, 478, 3)).astype(np.float32)
+
+    writer = LandmarkCacheWriter(tmp_path, frame_size=(640, 480))
+    for i, p in enumerate(points):
+        writer.append(float(i), p if i % 3 else None, video_id="clip" if i > 5 else None)
+    assert writer.capacity == 12        # grown three times
+    writer.close()
+
+    cache = LandmarkCache(tmp_path)
+    assert len(cache) == 11
+    np.testing.assert_array_equal(cache.t, np.arange(11))
+    np.testing.assert_array_equal(cache.valid[:, 0], [i % 3 != 0 for i in range(11)])
+    kept = cache.valid[:, 0].astype(bool)
+    np.testing.assert_allclose(cache.points[kept], points[kept].astype(np.float16))
+    assert cache.video_mask("clip").sum() == 5
@@ -0,0 +1,19 @@
+import os
+import threading
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def load_asset(path: str) -> bytes:
+    """
+    Reads a model file once per process and returns the same bytes object
+    to every caller, so stations running in one process share one copy.
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        data = _cache.get(key)
+        if data is None:
+            with open(key, "rb") as f:
+                data = _cache[key] = f.read()
+        return data
@@ -0,0 +1,186 @@
+import bisect
+import sys
+import threading
+import time
+
+# Upper bounds (ms) of the latency buckets; the last bucket is +Inf
+DEFAULT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 33, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (ms). O(log buckets) per observation."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_ms": self.sum,
+            "mean_ms": self.sum / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+            "buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Hot-path stage timers, counters and gauges.
+
+    Usage:
+        t0 = METRICS.start()
+        ...stage...
+        METRICS.observe("stage", t0)
+
+    When disabled, start() returns 0 and observe() returns immediately,
+    so instrumented code pays one attribute check per call.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+            self.started_at = time.monotonic()
+
+    def start(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def observe(self, stage: str, t0: float) -> None:
+        if not t0:
+            return
+        self.observe_ms(stage, (time.perf_counter() - t0) * 1000.0)
+
+    def observe_ms(self, stage: str, value_ms: float) -> None:
+        if not self.enabled:
+            return
+        h = self.histograms.get(stage)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(stage, Histogram())
+        h.observe(value_ms)
+
+    def inc(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name: str, value: float) -> None:
+        if self.enabled:
+            self.gauges[name] = value
+
+    # ---------- Reporting ----------
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms = dict(self.histograms)
+        return {
+            "enabled": self.enabled,
+            "uptime_s": time.monotonic() - self.started_at,
+            "stages": {k: h.to_dict() for k, h in sorted(histograms.items())},
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def to_prometheus(self, prefix: str = "amusement") -> str:
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_latency_ms histogram"]
+
+        for stage, h in snap["stages"].items():
+            cumulative = 0
+            for bound, c in h["buckets"].items():
+                cumulative += c
+                lines.append(f'{prefix}_stage_latency_ms_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_latency_ms_sum{{stage="{stage}"}} {h["sum_ms"]:.3f}')
+            lines.append(f'{prefix}_stage_latency_ms_count{{stage="{stage}"}} {h["count"]}')
+
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self) -> list:
+        snap = self.snapshot()
+        lines = [f"uptime: {snap['uptime_s']:.1f}s"]
+        for stage, h in snap["stages"].items():
+            lines.append(
+                f"{stage}: n={h['count']} mean={h['mean_ms']:.2f}ms "
+                f"p50<={h['p50_ms']}ms p95<={h['p95_ms']}ms max={h['max_ms']:.2f}ms"
+            )
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{name}: {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
+        return lines
+
+
+class RateMeter:
+    """Events per second over the last `window` seconds."""
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self.count = 0
+        self.window_start = time.monotonic()
+        self.rate = 0.0
+
+    def tick(self) -> float:
+        self.count += 1
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed >= self.window:
+            self.rate = self.count / elapsed
+            self.count = 0
+            self.window_start = now
+        return self.rate
+
+
+# Process-wide registry shared by the main loop, audio thread and web server
+METRICS = Metrics()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KiB on Linux
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
@@ -0,0 +1,141 @@
+import os
+import sys
+from fnmatch import fnmatchcase
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.01      # 100 Hz
+MIN_INTERVAL = 0.001         # faster sampling costs the session more than it shows
+MAX_DEPTH = 64
+
+# Threads without a fixed name, selected by pattern and reported under the alias.
+# Werkzeug (threaded=True) names each request thread "Thread-N (process_request_thread)".
+THREAD_ALIASES = {
+    "flask-request": "Thread-* (process_request_thread)",
+}
+
+
+class SamplingProfiler:
+    """
+    In-process statistical profiler.
+
+    A background thread snapshots sys._current_frames() every `interval`
+    seconds and counts the call stacks of the selected threads. Stacks
+    are keyed by code objects, so a sample costs a frame walk and a dict
+    update; strings are only built when dumping.
+
+    collapsed() returns one "thread;outer;...;inner count" line per
+    stack, the input format of flamegraph.pl / speedscope. Threads that
+    match a THREAD_ALIASES pattern are counted under the alias, so request
+    handlers aggregate into one "flask-request" root.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_names=None):
+        self.interval = interval
+        self.thread_names = set(thread_names) if thread_names else None
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self.trace_allocations = False
+        self.allocation_report = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, trace_allocations=False):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.allocation_report = []
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._stop.clear()
+
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self.stopped_at = time.time()
+
+        if self.trace_allocations and tracemalloc.is_tracing():
+            # Keep the last snapshot; tracing is too expensive to leave on
+            self.allocation_report = self.top_allocations()
+            tracemalloc.stop()
+
+    @staticmethod
+    def _display_name(name):
+        for alias, pattern in THREAD_ALIASES.items():
+            if fnmatchcase(name, pattern):
+                return alias
+        return name
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(max(self.interval, MIN_INTERVAL)):
+            names = {t.ident: self._display_name(t.name) for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                name = names.get(ident, str(ident))
+                if self.thread_names is not None and name not in self.thread_names:
+                    continue
+
+                codes = []
+                while frame is not None and len(codes) < MAX_DEPTH:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                self.stacks[(name, *codes)] += 1
+            self.samples += 1
+
+    # ---------- Output ----------
+    @staticmethod
+    def _label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def collapsed(self):
+        lines = []
+        for (thread, *codes), count in self.stacks.most_common():
+            stack = ";".join([thread.replace(";", "_")] + [self._label(c) for c in codes])
+            lines.append(f"{stack} {count}")
+        return "\n".join(lines) + "\n"
+
+    def top_allocations(self, limit=25):
+        """Top allocation sites by size (requires start(trace_allocations=True))."""
+        if not tracemalloc.is_tracing():
+            return self.allocation_report[:limit]
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        return [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+
+    def status(self):
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "duration_s": (end - self.started_at) if self.started_at else 0.0,
+            "tracing_allocations": tracemalloc.is_tracing(),
+        }
+
+
+# Shared instance controlled from the admin endpoints in web/server.py
+PROFILER = SamplingProfiler()
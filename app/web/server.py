@@ -1,10 +1,15 @@
+import hmac
 import threading
+import time
 import logging
+import math
 import os
 import sqlite3
 
 from flask import (
     Flask,
+    Response,
+    abort,
     render_template,
     request,
     jsonify,
@@ -13,6 +18,9 @@ from flask import (
     session
 )
 
+from utils.metrics import METRICS
+from utils.profiler import MIN_INTERVAL, PROFILER
+
 # Disable default Flask logging
 log = logging.getLogger("werkzeug")
 log.setLevel(logging.ERROR)
@@ -24,20 +32,56 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-change-me")
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app.db"))
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "affectivecomputing2025")
 
+# Prometheus scrapers send "Authorization: Bearer <METRICS_TOKEN>" (unset = admin session only)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
 # IMPORTANT:
 # Use rowid parity for splitting work between two reviewers.
 # 1 = odd rowid, 0 = even rowid
 ADMIN_ROWID_PARITY = 1  # <-- YOU keep 1 (odd). Your friend sets this to 0 (even).
 
-# Shared state for experiment
-STATE = {
-    "current_video_id": "WAITING",
-    "is_playing": False,
-    "finished": False,
-    "video_time": 0.0,
-    "participant": None,       # {"name":..., "age":..., "gender":...}
-    "ready_to_start": False
-}
+# Flask port (one server hosts every station of this machine)
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "5000"))
+
+DEFAULT_STATION = "default"
+
+# Don't run the clock ahead of a player that stopped reporting
+MAX_EXTRAPOLATION_SECONDS = 0.5
+
+
+def new_station_state():
+    return {
+        "current_video_id": "WAITING",
+        "is_playing": False,
+        "finished": False,
+        "video_time": 0.0,
+        "status_time": None,       # time.monotonic() of the last /status
+        "event_time": None,        # player clock (unix s) of the last /status
+        "last_switch": None,       # {"from", "to", "ended_at", "started_at"} (player clock)
+        "participant": None,       # {"name":..., "age":..., "gender":...}
+        "ready_to_start": False
+    }
+
+
+def playback_position(state, max_extrapolation=MAX_EXTRAPOLATION_SECONDS):
+    """
+    Current playback position in seconds. The player reports only every
+    200 ms, so while playing the last reported position is advanced by
+    the time since that report (at most `max_extrapolation`).
+    """
+    t = state["video_time"] or 0.0
+    if state["is_playing"] and state["status_time"] is not None:
+        t += min(time.monotonic() - state["status_time"], max_extrapolation)
+    return t
+
+
+# Shared state for experiment (default station, served on the un-prefixed routes)
+STATE = new_station_state()
+
+# Per-station state and playlists; other stations are served under /s/<station_id>/
+STATIONS = {DEFAULT_STATION: STATE}
+PLAYLISTS = {DEFAULT_STATION: []}
+_stations_lock = threading.Lock()
 
 # Admin review pointer (single-user lab usage)
 # (kept; no longer required for random selection, but not harmful)
@@ -45,12 +89,39 @@ ADMIN_STATE = {
     "last_rowid": 0
 }
 
+# Default station's playlist (kept for existing callers)
+current_playlist = []
 current_playlist_ids = []
 
 
-def set_playlist(video_ids):
-    global current_playlist_ids
-    current_playlist_ids = video_ids
+def register_station(station_id: str = DEFAULT_STATION):
+    """Returns the (new or existing) shared state dict of a station."""
+    with _stations_lock:
+        state = STATIONS.get(station_id)
+        if state is None:
+            state = STATIONS[station_id] = new_station_state()
+            PLAYLISTS[station_id] = []
+        return state
+
+
+def station_path(station_id: str = DEFAULT_STATION) -> str:
+    """URL prefix of a station's routes ("" for the default station)."""
+    return "" if station_id == DEFAULT_STATION else f"/s/{station_id}"
+
+
+def station_url(station_id: str = DEFAULT_STATION) -> str:
+    return f"http://127.0.0.1:{SERVER_PORT}{station_path(station_id)}/"
+
+
+def set_playlist(playlist, station_id: str = DEFAULT_STATION):
+    """playlist: [{"id": vid, "duration": seconds}] (bare ids are accepted, duration unknown)"""
+    global current_playlist, current_playlist_ids
+    playlist = [v if isinstance(v, dict) else {"id": v, "duration": None} for v in playlist]
+    register_station(station_id)
+    PLAYLISTS[station_id] = playlist
+    if station_id == DEFAULT_STATION:
+        current_playlist = playlist
+        current_playlist_ids = [v["id"] for v in playlist]
 
 
 # ===== DB helpers =====
@@ -97,35 +168,119 @@ def admin_update_status(vid: str, status: str):
 
 
 # ===== Routes: Experiment =====
-@app.route("/")
-def index():
-    return render_template("form.html")
+def _station_or_404(station_id):
+    state = STATIONS.get(station_id)
+    if state is None:
+        abort(404)
+    return state
 
 
-@app.route("/start", methods=["POST"])
-def start_experiment():
-    STATE["participant"] = {
+def _index(station_id):
+    _station_or_404(station_id)
+    return render_template("form.html", base=station_path(station_id))
+
+
+def _start(station_id):
+    state = _station_or_404(station_id)
+    state["participant"] = {
         "name": request.form.get("name"),
         "age": request.form.get("age"),
         "gender": request.form.get("gender")
     }
-    STATE["ready_to_start"] = True
-    return render_template("player.html", playlist=current_playlist_ids)
+    state["ready_to_start"] = True
+    return render_template(
+        "player.html",
+        playlist=PLAYLISTS.get(station_id, []),
+        base=station_path(station_id)
+    )
 
 
-@app.route("/status", methods=["POST"])
-def update_status():
+def _status(station_id):
+    state = _station_or_404(station_id)
     data = request.json or {}
-    STATE["current_video_id"] = data.get("video_id", "UNKNOWN")
-    STATE["is_playing"] = data.get("playing", False)
-    STATE["video_time"] = data.get("timestamp", 0.0)
+    state["current_video_id"] = data.get("video_id", "UNKNOWN")
+    state["is_playing"] = data.get("playing", False)
+    state["video_time"] = data.get("timestamp", 0.0)
+    state["status_time"] = time.monotonic()
+    state["event_time"] = data.get("event_time")
+
+    switch = data.get("switch")
+    if switch:
+        # Sent with the first "playing" of a clip: how long the swap took
+        state["last_switch"] = switch
+        if switch.get("ended_at") is not None and switch.get("started_at") is not None:
+            METRICS.observe_ms("player_switch", (switch["started_at"] - switch["ended_at"]) * 1000.0)
 
     if data.get("status") == "playlist_ended":
-        STATE["finished"] = True
+        state["finished"] = True
 
     return jsonify(success=True)
 
 
+@app.route("/")
+def index():
+    return _index(DEFAULT_STATION)
+
+
+@app.route("/start", methods=["POST"])
+def start_experiment():
+    return _start(DEFAULT_STATION)
+
+
+@app.route("/status", methods=["POST"])
+def update_status():
+    return _status(DEFAULT_STATION)
+
+
+@app.route("/s/<station_id>/")
+def station_index(station_id):
+    return _index(station_id)
+
+
+@app.route("/s/<station_id>/start", methods=["POST"])
+def station_start(station_id):
+    return _start(station_id)
+
+
+@app.route("/s/<station_id>/status", methods=["POST"])
+def station_status(station_id):
+    return _status(station_id)
+
+
+@app.route("/stations")
+def stations():
+    if not session.get("is_admin"):
+        return "Forbidden", 403
+
+    return jsonify({
+        sid: {k: v for k, v in state.items() if k != "participant"}
+        for sid, state in STATIONS.items()
+    })
+
+
+# ===== Routes: Metrics =====
+def _has_metrics_token():
+    if not METRICS_TOKEN:
+        return False
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip(), METRICS_TOKEN)
+
+
+@app.route("/metrics")
+def metrics():
+    if not (session.get("is_admin") or _has_metrics_token()):
+        return "Forbidden", 403
+
+    # Prometheus scrapers ask for text/plain; everyone else gets JSON
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "prometheus" if "text/plain" in request.headers.get("Accept", "") else "json"
+
+    if fmt == "prometheus":
+        return Response(METRICS.to_prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify(METRICS.snapshot())
+
+
 # ===== Routes: Admin/Test =====
 @app.route("/admin")
 def admin_login():
@@ -294,12 +449,84 @@ def admin_set_status():
     return jsonify({"ok": True})
 
 
+# ===== Routes: Admin profiler =====
+@app.route("/admin/profiler/start", methods=["POST"])
+def admin_profiler_start():
+    if not session.get("is_admin"):
+        return "Forbidden", 403
+
+    data = request.get_json(silent=True) or request.form
+    if PROFILER.running and ("interval" in data or "threads" in data):
+        return "Profiler is running; stop it before changing interval or threads", 409
+    try:
+        interval = float(data.get("interval", PROFILER.interval))
+    except (TypeError, ValueError):
+        return "Invalid interval", 400
+    if not math.isfinite(interval) or interval < MIN_INTERVAL:
+        return f"Interval must be at least {MIN_INTERVAL} s", 400
+    PROFILER.interval = interval
+
+    threads = data.get("threads")
+    if isinstance(threads, str):
+        threads = [t.strip() for t in threads.split(",") if t.strip()]
+    PROFILER.thread_names = set(threads) if threads else None
+
+    PROFILER.start(trace_allocations=str(data.get("tracemalloc", "0")).lower() in ("1", "true", "yes"))
+    return jsonify(PROFILER.status())
+
+
+@app.route("/admin/profiler/stop", methods=["POST"])
+def admin_profiler_stop():
+    if not session.get("is_admin"):
+        return "Forbidden", 403
+
+    PROFILER.stop()
+    return jsonify(PROFILER.status())
+
+
+@app.route("/admin/profiler/status")
+def admin_profiler_status():
+    if not session.get("is_admin"):
+        return "Forbidden", 403
+
+    return jsonify(PROFILER.status())
+
+
+@app.route("/admin/profiler/collapsed")
+def admin_profiler_collapsed():
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    if not session.get("is_admin"):
+        return "Forbidden", 403
+
+    return Response(
+        PROFILER.collapsed(),
+        mimetype="text/plain",
+        headers={"Content-Disposition": "attachment; filename=profile.collapsed"}
+    )
+
+
+@app.route("/admin/profiler/allocations")
+def admin_profiler_allocations():
+    if not session.get("is_admin"):
+        return "Forbidden", 403
+
+    limit = request.args.get("limit", 25, type=int)
+    return jsonify(PROFILER.top_allocations(limit=limit))
+
+
 # ===== Server startup =====
+_server_thread = None
+
+
 def run_server():
-    app.run(port=5000, use_reloader=False)
+    app.run(port=SERVER_PORT, use_reloader=False, threaded=True)
 
 
 def start_background_server():
-    t = threading.Thread(target=run_server, daemon=True)
-    t.start()
-    return STATE
\ No newline at end of file
+    """Starts the server once per process; later calls just return STATE."""
+    global _server_thread
+    with _stations_lock:
+        if _server_thread is None:
+            _server_thread = threading.Thread(target=run_server, name="flask-server", daemon=True)
+            _server_thread.start()
+    return STATE